@@ -3,21 +3,89 @@
 __all__ = ["quickstart_bot"]
 
 import json
+import logging
+import os
+import re
+import threading
 from pathlib import Path
-from typing import Any, Protocol
-from uuid import uuid4
-from pprint import pprint
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import Any, Callable, Protocol
 
+try:
+    import orjson
+except ImportError:  # orjson es opcional, ver extras en pyproject.toml
+    orjson = None
 
 import discord
 
 from corrector import Corrector, CsvModelLoader, NorvigCorrector
-from lib.http import HttpClient, Url
+from lib.http import HttpMethod, HttpResponse, HttpSender, Url
 from lib.websocket import WebsocketFactory
-from maybe import Maybe
 from model import AuthorizedUser, CreateMessage, Message, ReadyEvent
 
 base_api_url = "https://discord.com/api/v10"
+channel_messages_tmpl = base_api_url + "/channels/{}/messages"
+
+# Una palabra es todo lo que no sea un espacio en blanco o una coma.
+word_pattern = re.compile(r"[^\s,]+")
+
+# Limites de longitud de las palabras que se revisan. Fuera de estos
+# limites suelen ser urls, enlaces o codigos, y el algoritmo de Norvig crece
+# con el tamaño de la palabra.
+min_word_length = 3
+max_word_length = 20
+
+# orjson devuelve bytes directamente y es bastante mas rapido que el modulo
+# json de la libreria estandar, si no esta instalado usamos este ultimo.
+if orjson is not None:
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+else:
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode()
+    _loads = json.loads
+
+log = logging.getLogger(__name__)
+
+# Codigos de estado que se consideran exitosos en cada tipo de llamada.
+ok_status_message = frozenset({200, 204})
+ok_status_no_content = frozenset({204})
+
+
+def report_failure(ok_status: frozenset[int], *context: Any) -> Callable[[Future], None]:
+    """Crea un callback que reporta en el log las respuestas fallidas del
+    API REST.
+
+    Parameters
+    ----------
+    ok_status: frozenset[int]
+        Codigos de estado que se consideran exitosos.
+
+    context: list[Any]
+        Informacion extra que se reportara junto a la respuesta fallida.
+
+    Returns
+    -------
+    Callable[[Future], None]
+        Callback para pasar a `Future.add_done_callback`.
+    """
+    label = "".join(f" {value}" for value in context)
+
+    def callback(future: Future):
+        error = future.exception()
+        if error is not None:
+            log.warning("Fallo la llamada al API de discord%s: %s", label, error)
+            return
+        response: HttpResponse = future.result()
+        if response.status_code not in ok_status:
+            log.warning("El API de discord respondio %s%s: %s", response.status_code, label, response.body)
+    return callback
+
+
+# Los callbacks sin contexto son siempre iguales, se crean una sola vez.
+report_message_failure = report_failure(ok_status_message)
+report_interaction_failure = report_failure(ok_status_no_content)
 
 
 def button(msg: str, id: str | None = None) -> dict[str, Any]:
@@ -46,150 +114,118 @@ def button(msg: str, id: str | None = None) -> dict[str, Any]:
     }
 
 
-def send_msg(
-    user: AuthorizedUser,
-    channel_id: str,
-    msg: str,
-    message_id: str | None = None,
-    components: list[Any] | None = None,
-):
-    """Envia un mensaje de parte del usuario.
+# Cuerpo del mensaje que se envia al encontrar un error. Se serializa una
+# sola vez y en cada correccion solo se reemplazan los marcadores, ver
+# `correction_body`.
+correction_template = _dumps({
+    "content": "__CONTENT__",
+    "message_reference": {"message_id": "__MESSAGE_ID__"},
+    "components": [
+        {
+            "type": 1,
+            "components": [button("Agrega la palabra al diccionario.", "__CUSTOM_ID__")],
+        }
+    ],
+})
+
+
+def correction_body(reply: str, message_id: str, interaction_id: str) -> bytes:
+    """Llena `correction_template` con los datos de una correccion.
 
     Parameters
     ----------
-    channelId: str
-        Id del canal a donde enviar el mensaje.
+    reply: str
+        Contenido del mensaje.
 
-    msg: str
-        Contenido del mensaje a enviar.
+    message_id: str
+        Id del mensaje al que se responde.
 
-    message_id: str | None
-        Id del mensaje a referenciar, si no es None, esto lo enviara como
-        una respuesta.
+    interaction_id: str
+        Id del boton para agregar la palabra al diccionario.
 
-    components: list[Any] | None
-        Lista opcional de componentes.
+    Returns
+    -------
+    bytes
+        El mensaje serializado como json.
     """
-    headers = {
-        "Authorization": ["Bot " + user.token],
-        "Content-Type": ["application/json"],
-    }
-    payload: dict[str, Any] = {
-        "content": msg,
-    }
-    if message_id:
-        payload["message_reference"] = {"message_id": message_id}
-    if components:
-        payload["components"] = components
-    response = HttpClient.post(
-        Url.from_url(base_api_url + f"/channels/{channel_id}/messages"),
-        headers,
-        json.dumps(payload).encode(),
+    # Se serializa cada valor como una string de json y se le quitan las
+    # comillas, asi los caracteres especiales quedan escapados. El
+    # contenido se reemplaza de ultimo ya que viene del usuario y podria
+    # contener alguno de los otros marcadores.
+    return (
+        correction_template
+        .replace(b"__CUSTOM_ID__", _dumps(interaction_id)[1:-1], 1)
+        .replace(b"__MESSAGE_ID__", _dumps(message_id)[1:-1], 1)
+        .replace(b"__CONTENT__", _dumps(reply)[1:-1], 1)
     )
-    if response.status_code not in {200, 204}:
-        print(response.status_code)
-        pprint(response.body)
 
 
-def send_interaction_response(payload: dict[str, Any], interaction_id: str, interaction_token: str):
-    """Envia una respuesta a evento de Interaction.
+@lru_cache(maxsize=1024)
+def channel_messages_url(channel_id: str) -> Url:
+    """Url de los mensajes de un canal.
 
-    Revisa https://discord.com/developers/docs/interactions/receiving-and-responding#responding-to-an-interaction
-    para saber formas de responder a un Interaction
+    Se guarda en cache ya que el bot suele responder en los mismos canales
+    y asi se evita volver a analizar la url en cada envio.
 
     Parameters
     ----------
-    payload: dict[str, Any]
-        Un objeto respuesta. Vea https://discord.com/developers/docs/interactions/receiving-and-responding#interaction-response-object para saber mas.
-
-    interaction_id: str
-        Id del Interaction.
+    channel_id: str
+        Id del canal de discord.
 
-    interaction_token: str
-        Token del interaction. Valido 15 minutos despues de su creacion.
+    Returns
+    -------
+    Url
+        La url ya analizada.
     """
-    headers = {
-        "Content-Type": ["application/json"],
-    }
-    response = HttpClient.post(Url.from_url(
-        base_api_url + f"/interactions/{interaction_id}/{interaction_token}/callback"
-    ), headers, json.dumps(payload).encode())
-    if response.status_code != 204:
-        print(response.status_code)
-        pprint(response.body)
+    return Url.from_url(channel_messages_tmpl.format(channel_id))
 
-def send_interaction_text_response(msg: str, interaction_id: str, interaction_token: str):
-    """Envia un mensaje como respuesta a un evento de Interaction.
-
-    Revisa https://discord.com/developers/docs/interactions/receiving-and-responding#interaction-response-object-messages para mas detalles.
-
-    Parameters
-    ----------
-    msg: str
-        Cuerpo del mensaje.
-
-    interaction_id: str
-        Id del Interaction.
-
-    interaction_token: str
-        Token del interaction. Valido 15 minutos despues de su creacion.
-    """
-    payload = {
-        "type": 4,
-        "data": {
-            "content": msg,
-        },
-    }
-    send_interaction_response(payload, interaction_id, interaction_token)
 
-def send_interaction_ack_response(interaction_id: str, interaction_token: str):
-    """Envia un PONG como respuesta a un evento Interaction.
+class UuidPool:
+    """Generador de ids aleatorios con el formato de un UUID version 4.
 
-    Funciona como un no-operacion (noop) para cuando se recibe un Interaction.
+    En vez de pedirle al sistema operativo 16 bytes aleatorios por cada id
+    (como hace `uuid.uuid4`), se piden varios de una vez y se van
+    consumiendo.
 
     Parameters
     ----------
-    interaction_id: str
-        Id del Interaction.
-
-    interaction_token: str
-        Token del interaction. Valido 15 minutos despues de su creacion.
+    size: int
+        Cantidad de ids que se generan por cada llamada a `os.urandom`.
     """
-    payload = {
-        "type": 1
-    }
-    send_interaction_response(payload, interaction_id, interaction_token)
+    __slots__ = ("_size", "_pool", "_offset", "_lock")
 
+    def __init__(self, size: int = 64):
+        self._size = size
+        self._pool = b""
+        self._offset = 0
+        self._lock = threading.Lock()
 
-def delete_message(user: AuthorizedUser, channel_id: str, message_id: str):
-    """Borra un mensaje del historial de discord bajo la autorizacion de un
-    usuario o bot.
-
-    Parameters
-    ----------
-    channel_id: str
-        Id del canal de discord.
+    def next(self) -> str:
+        """Genera un nuevo id.
 
-    message_id: str
-        Id del mensaje de discord.
-    """
-    headers  = {
-        "Authorization" : ["Bot " + user.token]
-    }
-    response = HttpClient.delete(
-        Url.from_url(
-            base_api_url + f"/channels/{channel_id}/messages/{message_id}",
-        ),
-        headers
-    )
-    if response.status_code != 204:
-        print(channel_id, message_id)
-        print(response.status_code)
-        pprint(response.body)
+        Returns
+        -------
+        str
+            El UUID en hexadecimal, sin guiones.
+        """
+        with self._lock:
+            if self._offset >= len(self._pool):
+                self._pool = os.urandom(16 * self._size)
+                self._offset = 0
+            raw = bytearray(self._pool[self._offset:self._offset + 16])
+            self._offset += 16
+        # Marca la version (4) y la variante (RFC 4122), igual que
+        # `uuid.uuid4`.
+        raw[6] = (raw[6] & 0x0F) | 0x40
+        raw[8] = (raw[8] & 0x3F) | 0x80
+        return raw.hex()
 
 
 # Definicion de la logica del bot
 
+# Nombres de los comandos que entiende el bot, sin el prefijo.
+BOT_COMMANDS = ("activar", "desactivar", "ayuda")
+
 
 class BotConfig(Protocol):
     """Protocolo de configuracion del bot.
@@ -225,14 +261,29 @@ class BotConfig(Protocol):
         """
         ...
 
+    @property
+    def command_table(self) -> dict[str, str]:
+        """Tabla de los comandos del bot con su prefijo.
+
+        Returns
+        -------
+        dict[str, str]
+            Diccionario del comando con prefijo (como se escribe en
+            discord) al nombre del comando.
+        """
+        ...
+
 
 class BotInteractionsStore(Protocol):
     """Protocolo de las acciones que necesita un bot para guardar
     informacion de las interacciones.
     """
-    def get_interaction(self, interaction_id: str) -> Maybe[str]:
+    def get_interaction(self, interaction_id: str) -> str | None:
         """Obten la palabra de una interaccion.
 
+        Las interacciones solo se pueden usar una vez, de forma que la
+        interaccion se olvida despues de obtenerla.
+
         Parameters
         ----------
         interaction_id: str
@@ -240,7 +291,7 @@ class BotInteractionsStore(Protocol):
 
         Returns
         -------
-        Maybe[str]
+        str | None
             Palabra que esta asociada a esta interaction, si existe.
         """
         ...
@@ -263,23 +314,128 @@ class BotInteractionsStore(Protocol):
 class InMemoryBotInteractionsStore:
     """Implementacion del protocolo `BotInteractionsStore` para operaciones en la memoria.
     """
+    __slots__ = ("store",)
+
     def __init__(self):
         self.store: dict[str, str] = {}
 
-    def get_interaction(self, interaction_id: str) -> Maybe[str]:
-        return Maybe(self.store.get(interaction_id))
+    def get_interaction(self, interaction_id: str) -> str | None:
+        # Se saca del diccionario para que no crezca sin limite mientras el
+        # bot este corriendo.
+        return self.store.pop(interaction_id, None)
 
     def save_interaction(self, interaction_id: str, word: str):
         self.store[interaction_id] = word
 
 
+class FileBotInteractionsStore:
+    """Implementacion del protocolo `BotInteractionsStore` que guarda las
+    interacciones en un archivo, de forma que no se pierden si el bot se
+    reinicia.
+
+    El archivo es un registro en el que cada linea es un objeto json. Al
+    guardar una interaccion se agrega `{"id": ..., "word": ...}` y al
+    obtenerla se agrega `{"id": ...}` para marcarla como usada. Al
+    iniciar, y cada `compact_every` registros agregados, el archivo se
+    reescribe solo con las interacciones pendientes, de forma que no crece
+    sin limite.
+
+    Si el bot se cae mientras escribe, la ultima linea puede quedar
+    cortada. Las lineas que no se pueden leer se descartan al iniciar en
+    vez de impedir que el bot arranque.
+
+    Parameters
+    ----------
+    path: str | Path
+        Camino al archivo del registro.
+
+    compact_every: int
+        Cantidad de registros agregados tras la cual se reescribe el
+        archivo.
+    """
+    __slots__ = ("path", "store", "compact_every", "_appended", "_lock")
+
+    def __init__(self, path: str | Path, compact_every: int = 1024):
+        self.path = Path(path)
+        self.store: dict[str, str] = {}
+        self.compact_every = compact_every
+        self._appended = 0
+        self._lock = threading.Lock()
+        if self.path.exists():
+            self._load()
+        self._compact()
+
+    def _load(self):
+        with open(self.path, "rb") as log_file:
+            for line_number, line in enumerate(log_file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = _loads(line)
+                    interaction_id = record["id"]
+                except (ValueError, KeyError, TypeError):
+                    # Normalmente es la ultima linea, cortada por una caida
+                    # a mitad de escritura. `_compact` la elimina.
+                    log.warning("Registro de interacciones ilegible en %s:%d, se descarta", self.path, line_number)
+                    continue
+                word = record.get("word")
+                if word is None:
+                    self.store.pop(interaction_id, None)
+                else:
+                    self.store[interaction_id] = word
+
+    def _compact(self):
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "wb") as log_file:
+            for interaction_id, word in self.store.items():
+                log_file.write(_dumps({"id": interaction_id, "word": word}) + b"\n")
+        os.replace(tmp_path, self.path)
+        self._appended = 0
+
+    def _append(self, record: dict[str, str]):
+        # Se llama con `_lock` tomado.
+        self._appended += 1
+        if self._appended >= self.compact_every:
+            # El registro ya esta en `store`, asi que reescribir el archivo
+            # tambien lo guarda.
+            self._compact()
+            return
+        with open(self.path, "ab") as log_file:
+            log_file.write(_dumps(record) + b"\n")
+
+    def get_interaction(self, interaction_id: str) -> str | None:
+        with self._lock:
+            word = self.store.pop(interaction_id, None)
+            if word is not None:
+                self._append({"id": interaction_id})
+            return word
+
+    def save_interaction(self, interaction_id: str, word: str):
+        with self._lock:
+            self.store[interaction_id] = word
+            self._append({"id": interaction_id, "word": word})
+
+
 # Go-esque implementation without compile-time assurance
 class InMemoryBotConfig:
     """Implementacion del protocolo `BotConfig` para configuracion en la memoria.
     """
-    def __init__(self, prefix: str, pedantic: bool = True):
+    __slots__ = ("_pedantic", "_prefix", "_commands", "_command_table")
+
+    def __init__(self, prefix: str, pedantic: bool = True, commands: tuple[str, ...] = BOT_COMMANDS):
         self._pedantic = pedantic
         self._prefix = prefix
+        self._commands = commands
+        self._command_table: dict[str, str] = {}
+        self._build_command_table()
+
+    def _build_command_table(self):
+        # Se modifica el mismo diccionario en vez de crear uno nuevo, asi
+        # quien tenga una referencia a la tabla ve el cambio de prefijo.
+        self._command_table.clear()
+        self._command_table.update(
+            (self._prefix + command, command) for command in self._commands
+        )
 
     @property
     def is_being_pedantic(self) -> bool:
@@ -293,6 +449,15 @@ class InMemoryBotConfig:
     def prefix(self) -> str:
         return self._prefix
 
+    @prefix.setter
+    def prefix(self, value: str) -> None:
+        self._prefix = value
+        self._build_command_table()
+
+    @property
+    def command_table(self) -> dict[str, str]:
+        return self._command_table
+
 
 class Bot(discord.DiscordGatewayClient):
     """Bot de Pedantic. Se encarga de leer todos los mensajes de discord y
@@ -309,6 +474,23 @@ class Bot(discord.DiscordGatewayClient):
     _interaction_store: BotInteractionsStore
         El encargado de ayudar a coordinar los eventos de la api Interaction.
     """
+    # DiscordGatewayClient no declara __slots__, asi que las instancias
+    # siguen teniendo __dict__, pero los atributos usados en cada mensaje se
+    # leen desde los slots.
+    __slots__ = (
+        "_bot_config",
+        "_corrector",
+        "_interaction_store",
+        "_sender",
+        "_auth_headers",
+        "_auth_json_headers",
+        "_json_headers",
+        "_uuid_pool",
+        "_ayuda_body",
+        "_cmds",
+        "_command_handlers",
+    )
+
     def __init__(
         self,
         *,
@@ -321,33 +503,201 @@ class Bot(discord.DiscordGatewayClient):
         self._bot_config = bot_config
         self._corrector = corrector
         self._interaction_store = interaction_store
+        # Todas las llamadas al API REST pasan por estos hilos, de forma que
+        # el hilo que maneja el evento no se queda esperando la respuesta de
+        # discord. Los envios de un mismo canal usan siempre el mismo hilo
+        # para que los mensajes lleguen en orden.
+        self._sender = HttpSender(workers=4)
+        # Encabezados que se reutilizan en cada llamada al API REST. Las
+        # llamadas sin cuerpo, como DELETE, no declaran Content-Type.
+        self._auth_headers = {
+            "Authorization": ["Bot " + self.token],
+        }
+        self._auth_json_headers = {
+            "Authorization": ["Bot " + self.token],
+            "Content-Type": ["application/json"],
+        }
+        self._json_headers = {
+            "Content-Type": ["application/json"],
+        }
+        self._uuid_pool = UuidPool()
+        # El mensaje de ayuda nunca cambia, asi que se serializa una sola vez.
+        self._ayuda_body = _dumps({
+            "content": """Prefijo: =>
+=>activar: Empieza ser pedantico.
+=>desactivar: Calla al pedantico""",
+        })
+        self._cmds = bot_config.command_table
+        self._command_handlers: dict[str, Callable[[AuthorizedUser, Message], None]] = {
+            "activar": self.on_activar,
+            "desactivar": self.on_desactivar,
+            "ayuda": self.on_ayuda,
+        }
 
         # Decoradores
         self.on_message = self.register(
-            discord.GatewayEvents.MESSAGE_CREATE, lambda data: CreateMessage(**data)
+            discord.GatewayEvents.MESSAGE_CREATE, CreateMessage.from_dict
         )(self.on_message)
         self.on_ready = self.register(discord.GatewayEvents.READY)(self.on_ready)
         self.on_interaction = self.register(discord.GatewayEvents.INTERACTION_CREATE)(
             self.on_interaction
         )
 
-    def prefixed_with(self, content: str, command: str) -> bool:
-        """Revisa si el mensaje es un comando de bot con dicho nombre.
+    def close(self):
+        """Espera a que se terminen de enviar las llamadas pendientes al
+        API REST y detiene los hilos de envio.
+        """
+        self._sender.close()
+
+    def send_msg(
+        self,
+        channel_id: str,
+        msg: str,
+        message_id: str | None = None,
+        components: list[Any] | None = None,
+    ):
+        """Envia un mensaje de parte del bot.
 
         Parameters
         ----------
-        content: str
-            El contenido del mensaje.
+        channel_id: str
+            Id del canal a donde enviar el mensaje.
 
-        command: str
-            El comando que esperamos.
+        msg: str
+            Contenido del mensaje a enviar.
 
-        Returns
-        -------
-        bool
-            Verdadero si es ese comando, falso en caso contrario.
+        message_id: str | None
+            Id del mensaje a referenciar, si no es None, esto lo enviara como
+            una respuesta.
+
+        components: list[Any] | None
+            Lista opcional de componentes.
+        """
+        payload: dict[str, Any] = {
+            "content": msg,
+        }
+        if message_id:
+            payload["message_reference"] = {"message_id": message_id}
+        if components:
+            payload["components"] = components
+        self.send_raw_msg(channel_id, _dumps(payload))
+
+    def send_raw_msg(self, channel_id: str, body: bytes):
+        """Envia un mensaje que ya esta serializado como json.
+
+        Parameters
+        ----------
+        channel_id: str
+            Id del canal a donde enviar el mensaje.
+
+        body: bytes
+            El objeto mensaje ya serializado. Vea
+            https://discord.com/developers/docs/resources/channel#create-message
+            para saber su formato.
+        """
+        self._sender.submit(
+            HttpMethod.POST,
+            channel_messages_url(channel_id),
+            self._auth_json_headers,
+            body,
+            key=channel_id,
+        ).add_done_callback(report_message_failure)
+
+    def send_interaction_response(self, payload: dict[str, Any], interaction_id: str, interaction_token: str, channel_id: str | None = None):
+        """Envia una respuesta a evento de Interaction.
+
+        Revisa https://discord.com/developers/docs/interactions/receiving-and-responding#responding-to-an-interaction
+        para saber formas de responder a un Interaction
+
+        Parameters
+        ----------
+        payload: dict[str, Any]
+            Un objeto respuesta. Vea https://discord.com/developers/docs/interactions/receiving-and-responding#interaction-response-object para saber mas.
+
+        interaction_id: str
+            Id del Interaction.
+
+        interaction_token: str
+            Token del interaction. Valido 15 minutos despues de su creacion.
+
+        channel_id: str | None
+            Canal donde ocurrio el Interaction. La respuesta se encola con
+            la misma llave que los demas envios del canal, para que salga
+            en orden con ellos (por ejemplo, antes de borrar el mensaje).
+            Si no se conoce se usa el id del Interaction.
+        """
+        self._sender.submit(HttpMethod.POST, Url.from_url(
+            base_api_url + f"/interactions/{interaction_id}/{interaction_token}/callback"
+        ), self._json_headers, _dumps(payload), key=channel_id or interaction_id).add_done_callback(report_interaction_failure)
+
+    def send_interaction_text_response(self, msg: str, interaction_id: str, interaction_token: str, channel_id: str | None = None):
+        """Envia un mensaje como respuesta a un evento de Interaction.
+
+        Revisa https://discord.com/developers/docs/interactions/receiving-and-responding#interaction-response-object-messages para mas detalles.
+
+        Parameters
+        ----------
+        msg: str
+            Cuerpo del mensaje.
+
+        interaction_id: str
+            Id del Interaction.
+
+        interaction_token: str
+            Token del interaction. Valido 15 minutos despues de su creacion.
+
+        channel_id: str | None
+            Canal donde ocurrio el Interaction.
+        """
+        payload = {
+            "type": 4,
+            "data": {
+                "content": msg,
+            },
+        }
+        self.send_interaction_response(payload, interaction_id, interaction_token, channel_id)
+
+    def send_interaction_ack_response(self, interaction_id: str, interaction_token: str, channel_id: str | None = None):
+        """Envia un PONG como respuesta a un evento Interaction.
+
+        Funciona como un no-operacion (noop) para cuando se recibe un Interaction.
+
+        Parameters
+        ----------
+        interaction_id: str
+            Id del Interaction.
+
+        interaction_token: str
+            Token del interaction. Valido 15 minutos despues de su creacion.
+
+        channel_id: str | None
+            Canal donde ocurrio el Interaction.
+        """
+        payload = {
+            "type": 1
+        }
+        self.send_interaction_response(payload, interaction_id, interaction_token, channel_id)
+
+    def delete_message(self, channel_id: str, message_id: str):
+        """Borra un mensaje del historial de discord bajo la autorizacion
+        del bot.
+
+        Parameters
+        ----------
+        channel_id: str
+            Id del canal de discord.
+
+        message_id: str
+            Id del mensaje de discord.
         """
-        return content == self._bot_config.prefix + command
+        self._sender.submit(
+            HttpMethod.DELETE,
+            Url.from_url(
+                channel_messages_tmpl.format(channel_id) + f"/{message_id}",
+            ),
+            self._auth_headers,
+            key=channel_id,
+        ).add_done_callback(report_failure(ok_status_no_content, channel_id, message_id))
 
     def show_status(self, user: AuthorizedUser, message: CreateMessage):
         """Envia un mensaje con el estado del bot en el canal de discord
@@ -362,7 +712,7 @@ class Bot(discord.DiscordGatewayClient):
             El mensaje que incio este evento.
         """
         reply = "Activado" if self._bot_config.is_being_pedantic else "Desactivado"
-        send_msg(user, message.channel_id, reply, message.id)
+        self.send_msg(message.channel_id, reply, message.id)
 
     def register_new_word(self, word: str, user: AuthorizedUser, interaction_message: Any):
         """Registra una nueva palabra en el diccionario y avisa del cambio por discord.
@@ -379,45 +729,72 @@ class Bot(discord.DiscordGatewayClient):
             En evento que inicio esta accion.
 
         """
+        message = interaction_message.get("message")
+        if not message:
+            return
+        channel_id = message.get("channel_id")
+        message_id = message.get("id")
+        interaction_token = interaction_message.get("token")
+        interaction_id = interaction_message.get("id")
+        if not all((channel_id, message_id, interaction_token, interaction_id)):
+            return
 
-        Maybe.do(
-            Maybe.progn(lambda: self._corrector.add_word(word),
-                        lambda: send_interaction_text_response(f"Se agrego {word} al diccionario.",
-                                                               interaction_id, interaction_token),
-                        lambda: delete_message(user, channel_id, message_id))
-        for message in Maybe(interaction_message.get("message"))
-        for channel_id in Maybe(message.get("channel_id"))
-        for message_id in Maybe(message.get("id"))
-        for interaction_token in Maybe(interaction_message.get("token"))
-        for interaction_id in Maybe(interaction_message.get("id"))
-        )
+        self._corrector.add_word(word)
+        self.send_interaction_text_response(f"Se agrego {word} al diccionario.",
+                                            interaction_id, interaction_token, channel_id)
+        self.delete_message(channel_id, message_id)
 
     def on_interaction(self, user: AuthorizedUser, message: Any):
         """Manejador del evento INTERACTION_CREATE.
         """
 
-        operation = Maybe.do(
-            # or True, forzara a esta expresion a evaluarse a un valor
-            # valido, de esa forma nosotros podemos desampacarlo y saber si
-            # la operacion si se ejecuto.
-            self.register_new_word(word, user, message) or True
-            for data in Maybe(message.get("data"))
-            for custom_id in Maybe(data.get("custom_id"))
-            for word in self._interaction_store.get_interaction(custom_id)
-        ).value
-
-        if operation is None:
-            Maybe.do(
-                send_interaction_ack_response(interaction_id, interaction_token)
-                for interaction_token in Maybe(message.get("token"))
-                for interaction_id in Maybe(message.get("id"))
-            )
+        data = message.get("data")
+        custom_id = data.get("custom_id") if data else None
+        word = self._interaction_store.get_interaction(custom_id) if custom_id else None
+
+        if word is not None:
+            self.register_new_word(word, user, message)
+            return
+
+        interaction_token = message.get("token")
+        interaction_id = message.get("id")
+        if interaction_token and interaction_id:
+            self.send_interaction_ack_response(interaction_id, interaction_token,
+                                               message.get("channel_id"))
 
     def on_ready(self, user: AuthorizedUser, message: ReadyEvent):
         """Manejador del evento READY.
         """
         print("Sesion iniciada como " + user.username)
 
+    def on_activar(self, user: AuthorizedUser, message: Message):
+        """Responde al comando activar.
+
+        Parameters
+        ----------
+        user: AuthorizedUser
+            El bot o usuario que esta ejecutando esta accion.
+
+        message: Message
+            El mensaje que inicio este evento.
+        """
+        self._bot_config.is_being_pedantic = True
+        self.show_status(user, message)
+
+    def on_desactivar(self, user: AuthorizedUser, message: Message):
+        """Responde al comando desactivar.
+
+        Parameters
+        ----------
+        user: AuthorizedUser
+            El bot o usuario que esta ejecutando esta accion.
+
+        message: Message
+            El mensaje que inicio este evento.
+        """
+        self._bot_config.is_being_pedantic = False
+        self.show_status(user, message)
+
     def on_ayuda(self, user: AuthorizedUser, message: Message):
         """Responde al evento de Ayuda.
 
@@ -429,13 +806,7 @@ class Bot(discord.DiscordGatewayClient):
         message: Message
             El mensaje que inicio este evento.
         """
-        send_msg(
-            user,
-            message.channel_id,
-            """Prefijo: =>
-=>activar: Empieza ser pedantico.
-=>desactivar: Calla al pedantico""",
-            )
+        self.send_raw_msg(message.channel_id, self._ayuda_body)
 
     def on_message(self, user: AuthorizedUser, message: CreateMessage):
         """Manejador del evento MESSAGE_CREATE.
@@ -449,39 +820,34 @@ class Bot(discord.DiscordGatewayClient):
         if len(message.content) <= 1:
             return
 
-        if self.prefixed_with(message.content, "activar"):
-            self._bot_config.is_being_pedantic = True
-            self.show_status(user, message)
-            return
-
-        if self.prefixed_with(message.content, "desactivar"):
-            self._bot_config.is_being_pedantic = False
-            self.show_status(user, message)
-            return
-
-        if self.prefixed_with(message.content, "ayuda"):
-            self.on_ayuda(user, message)
-            return
+        # Los comandos siempre empiezan con el prefijo, de forma que los
+        # mensajes normales (la mayoria) se descartan sin buscar en la tabla.
+        prefix = self._bot_config.prefix
+        if message.content.startswith(prefix):
+            command = self._cmds.get(message.content)
+            if command is not None:
+                self._command_handlers[command](user, message)
+                return
 
         if not self._bot_config.is_being_pedantic:
             return
 
-        for word in message.content.replace(",", "").split(" "):
-            corrections = self._corrector.spell_check(word)
+        # Se saca a una variable local para no resolver el atributo en cada
+        # iteracion del bucle.
+        spell_check = self._corrector.spell_check
+        for match in word_pattern.finditer(message.content):
+            word = match.group(0)
+            if not min_word_length <= len(word) <= max_word_length or not word.isalpha():
+                continue
+            corrections = spell_check(word)
             if corrections and corrections[0] != word:
                 message_reply = f"Un error tipografico en la palabra *{word}*, ¿quisiste decir *{corrections[0]}*?"
-                message_reply += f"\nEscribe *{self._bot_config.prefix}ayuda* para ver mas opciones."
-                interaction_id = str(uuid4())
-                to_send_button = button(
-                    "Agrega la palabra al diccionario.", interaction_id
-                )
+                message_reply += f"\nEscribe *{prefix}ayuda* para ver mas opciones."
+                interaction_id = self._uuid_pool.next()
                 self._interaction_store.save_interaction(interaction_id, word)
-                send_msg(
-                    user,
+                self.send_raw_msg(
                     message.channel_id,
-                    message_reply,
-                    message.id,
-                    [{"type": 1, "components": [to_send_button]}],
+                    correction_body(message_reply, message.id, interaction_id),
                 )
                 return
 
@@ -548,4 +914,7 @@ def quickstart_bot():
         intents=intents,
     )
 
-    bot.run()
+    try:
+        bot.run()
+    finally:
+        bot.close()
@@ -1,7 +1,10 @@
 """Logica del corrector de palabras."""
 
 import re
-from typing import Protocol
+import threading
+from bisect import bisect_left, insort
+from functools import lru_cache, partial
+from typing import Iterator, Protocol
 
 from pathlib import Path
 import csv
@@ -15,6 +18,135 @@ config = dotenv_values(".env")
 # Clases de modelo
 
 
+class Trie:
+    """Arbol de prefijos de las palabras del diccionario.
+
+    Se representa como una lista ordenada: los nodos son los rangos de la
+    lista que comparten un prefijo y se encuentran con busqueda binaria.
+    Un arbol de diccionarios anidados ocuparia cientos de megabytes con el
+    modelo completo, mientras que la lista solo guarda una referencia por
+    palabra.
+
+    La lista nunca se modifica: `add` arma una nueva y la reemplaza, asi
+    que una busqueda en otro hilo sigue recorriendo la lista que leyo al
+    empezar sin ver los indices moverse.
+    """
+
+    def __init__(self, words):
+        self.words = sorted(words)
+        self._lock = threading.Lock()
+
+    def add(self, word: str):
+        """Inserta una palabra nueva manteniendo el orden."""
+        # El lock solo ordena a los que agregan entre si; los que buscan
+        # no lo toman.
+        with self._lock:
+            words = self.words.copy()
+            insort(words, word)
+            self.words = words
+
+    @staticmethod
+    def child(words: list[str], prefix: str, lo: int, hi: int, c: str) -> tuple[str, int, int]:
+        """Nodo hijo de `prefix` por la letra `c`. Vacio si `lo == hi`."""
+        prefix += c
+        lo = bisect_left(words, prefix, lo, hi)
+        # Todas las palabras que empiezan con `prefix` son menores que
+        # el prefijo con la ultima letra incrementada.
+        return prefix, lo, bisect_left(words, prefix[:-1] + chr(ord(c) + 1), lo, hi)
+
+    @staticmethod
+    def children(words: list[str], prefix: str, lo: int, hi: int) -> Iterator[tuple[str, int, int]]:
+        """Genera los nodos hijos de `prefix`, uno por cada letra que lo continua."""
+        depth = len(prefix)
+        # La palabra igual al prefijo, si existe, va primero en el rango
+        if lo < hi and len(words[lo]) == depth:
+            lo += 1
+        while lo < hi:
+            c = words[lo][depth]
+            hi_c = bisect_left(words, prefix + chr(ord(c) + 1), lo, hi)
+            yield prefix + c, lo, hi_c
+            lo = hi_c
+
+    def search(self, word: str, max_edits: int) -> set[str]:
+        """
+        Busca las palabras del arbol a `max_edits` ediciones o menos de `word`.
+
+        Recorre el arbol aplicando las mismas ediciones que Norvig (borrar,
+        transponer, reemplazar e insertar), pero solo sigue las ramas que
+        existen, asi que nunca construye palabras desconocidas. Con dos
+        ediciones debe dar las mismas palabras conocidas que el `edits2` de
+        Norvig, incluidas las transposiciones de letras que otra edicion
+        separa o junta.
+
+        Parameters
+        ----------
+        word : str
+            Palabra a corregir
+        max_edits : int
+            Cantidad maxima de ediciones
+
+        Returns
+        -------
+        set[str]
+            Palabras conocidas alcanzables desde `word`
+        """
+        # Toda la busqueda usa la misma lista, aunque `add` la reemplace
+        # mientras tanto.
+        words = self.words
+        child = partial(self.child, words)
+        children = partial(self.children, words)
+        found = set()
+        # Distintas secuencias de ediciones llegan al mismo estado. Se guarda
+        # el mayor presupuesto con el que se visito cada estado: volver con
+        # menos ediciones no puede encontrar nada nuevo.
+        seen = {}
+
+        def _search(prefix, lo, hi, rest, edits_left):
+            if lo >= hi:
+                return
+            if not edits_left:
+                # Sin ediciones el automata es una cadena recta: solo queda
+                # ver si el resto de la palabra completa una del arbol.
+                target = prefix + rest
+                i = bisect_left(words, target, lo, hi)
+                if i < hi and words[i] == target:
+                    found.add(target)
+                return
+            if seen.get((prefix, rest), -1) >= edits_left:
+                return
+            seen[prefix, rest] = edits_left
+            if not rest and words[lo] == prefix:
+                found.add(prefix)
+            if rest:
+                _search(*child(prefix, lo, hi, rest[0]), rest[1:], edits_left)
+            edits_left -= 1
+            if rest:
+                _search(prefix, lo, hi, rest[1:], edits_left)
+                if len(rest) > 1:
+                    swapped = child(prefix, lo, hi, rest[1])
+                    if swapped[1] < swapped[2]:
+                        _search(*child(*swapped, rest[0]), rest[2:], edits_left)
+                        if edits_left:
+                            # `edits2` tambien transpone letras que quedan
+                            # juntas por otra edicion: "ab" -> "ba" -> "bca",
+                            # una letra insertada entre las transpuestas.
+                            for node in children(*swapped):
+                                _search(*child(*node, rest[0]), rest[2:], edits_left - 1)
+                if edits_left and len(rest) > 2:
+                    # Y al reves, una letra borrada entre las dos que se
+                    # transponen: "azb" -> "ab" -> "ba".
+                    swapped = child(prefix, lo, hi, rest[2])
+                    if swapped[1] < swapped[2]:
+                        _search(*child(*swapped, rest[0]), rest[3:], edits_left - 1)
+            for node in children(prefix, lo, hi):
+                if rest:
+                    _search(*node, rest[1:], edits_left)
+                _search(*node, rest, edits_left)
+
+        _search("", 0, len(words), word, max_edits)
+        return found
+
+
 class WordStatistics:
     """Coleccion de palabras. Contiene funciones que actuan sobre esta
     colecion para ofrecer informacion estadistica.
@@ -22,8 +154,9 @@ class WordStatistics:
 
     def __init__(self, words: dict[str, int]):
         self.words = words
-        self.letters = list(set("".join(words.keys())))
-        self._size = None
+        self.trie = Trie(words)
+        # Se suma una sola vez y luego se lleva la cuenta en `add_word`.
+        self._size = sum(words.values())
 
     @property
     def size(self) -> int:
@@ -31,8 +164,6 @@ class WordStatistics:
 
         No es lo mismo que la cantidad de las palabras
         """
-        if not self._size:
-            self._size = sum(self.words.values())
         return self._size
 
     def get_freq_abs(self, word: str) -> Maybe[int]:
@@ -46,6 +177,8 @@ class WordStatistics:
             self.words[word] += 1
         else:
             self.words[word] = 1
+            self.trie.add(word)
+        self._size += 1
 
 
 class Corrector(Protocol):
@@ -86,6 +219,9 @@ class NorvigCorrector:
         """
         self.word_statistics = word_statistics
         self.saver = saver
+        # Las mismas faltas se repiten entre mensajes. La cache es por
+        # instancia para no retener al corrector desde el nivel de modulo.
+        self._cached_candidates = lru_cache(maxsize=8192)(self._find_candidates)
 
     def add_word(self, word: str):
         """Añade una palabra al diccionario.
@@ -96,87 +232,86 @@ class NorvigCorrector:
             Palabra a añadir.
         """
         self.word_statistics.add_word(word)
+        # Una palabra nueva puede ser candidata de faltas ya vistas
+        self._cached_candidates.cache_clear()
         self.saver.save_model(self.word_statistics)
 
-    def edits1(self, word: str):
-        """
-        Genera las ediciones 1 de la palabra a la vez
-
-        Parameters
-        ----------
-        word : str
-            Palabra de la cual se generaran las ediciones
-
-        Returns
-        -------
-        set
-            Conjunto que contiene todas las ediciones a una distancia de edicion de 1 de la palabra
-        """
-
-        # Genera una lista de tuplas de sub-palabras de la palabra `word`
-        # las cuales se dividen en pedazos. el + 1 es por que el slicing
-        # parara en i, lo cual no incluira el final de la lista si solo se toma la longitud
-        # Ejemplo: word = sazon
-        # splits = [("", "sazon"), ("s", "azon"), ("sa", "zon"), ("saz", "on"), ("sazo", "n"), ("sazon", "")]
-        splits = [(word[:i], word[i:]) for i in range(len(word) + 1)]
-
-        # Elimina una palabra. Hace esto saltandose una letra del lado
-        # derecho de las divisiones anterior y concatenando con el lado derecho
-        deletes = [L + R[1:] for L, R in splits if R]
-        # Transpone dos letras que estan adayacentes entre si.
-        # Usa el mismo truco que el anterior
-        transposes = [L + R[1] + R[0] + R[2:] for L, R in splits if len(R) > 1]
-        replaces = [L + c + R[1:] for L, R in splits if R for c in self.word_statistics.letters]
-        inserts = [L + c + R for L, R in splits for c in self.word_statistics.letters]
-        return set(deletes + transposes + replaces + inserts)
-
-    def edits2(self, word):
-        "All edits that are two edits away from `word`."
-        return (e2 for e1 in self.edits1(word) for e2 in self.edits1(e1))
-
     def candidates(self, word):
         "Generate possible spelling corrections for word."
-        return (
+        return self._cached_candidates(word)
+
+    def _find_candidates(self, word) -> tuple[str, ...]:
+        # Se recorre el arbol de prefijos en lugar de generar todas las
+        # ediciones de Norvig, que construyen miles de palabras que luego se
+        # descartan. tests/test_corrector.py comprueba que den lo mismo.
+        trie = self.word_statistics.trie
+        return tuple(
             self.known([word])
-            or self.known(self.edits1(word))
-            or self.known(self.edits2(word))
+            or trie.search(word, 1)
+            or trie.search(word, 2)
             or [word]
         )
 
     def known(self, words):
         "The subset of `words` that appear in the dictionary of WORDS."
-        return set(w for w in words if w in self.word_statistics.words)
+        # La interseccion con la vista de llaves del diccionario se hace en
+        # C, sin pasar por el interprete por cada palabra.
+        return self.word_statistics.words.keys() & words
 
     def spell_check(self, word: str) -> list[str]:
-        return [max(self.candidates(word), key=lambda x: self.word_statistics.get_freq_rel(x).value or -1)]
+        # Para elegir la mas frecuente basta la frecuencia absoluta. Los
+        # candidatos siempre son palabras conocidas, salvo cuando no hay
+        # ninguno y se devuelve la misma palabra sola, y `max` no compara
+        # un unico elemento.
+        return [max(self.candidates(word), key=self.word_statistics.words.get)]
 
 
 class CsvModelLoader:
+    # Una palabra tiene al menos un caracter alfanumerico.
+    word_pattern = re.compile(r"\w")
+
     def __init__(self, model_path: str | Path):
         self.model_path = model_path
 
     def only_words(self, word):
-        return (
-            Maybe(re.search(r"\w+", word)).map(lambda x: x.group()).value
-            and word not in "1234567890"
-        )
+        # Casi todas las filas son solo letras, y `isalpha` las acepta sin
+        # pasar por el motor de expresiones regulares.
+        if word.isalpha():
+            return True
+        # `isdigit` descarta cualquier numero. Antes se comprobaba si la
+        # palabra estaba dentro de "1234567890", lo que dejaba pasar
+        # numeros como "10" o "2004".
+        return self.word_pattern.search(word) is not None and not word.isdigit()
 
     def get_model(self) -> WordStatistics:
         with open(self.model_path, encoding="utf8") as model_file:
-            # Este conjunto de datos usa la comilla como character
-            model_reader = csv.reader(model_file, delimiter="\t", quotechar=None)
-            model_reader = filter(lambda line: self.only_words(line[0]), model_reader)
-            # Salta el encabezado
-            next(model_reader)
-            return WordStatistics(
-                {line[0]: int(line[1]) for line in model_reader}
-            )
+            text = model_file.read()
+        # El archivo tiene dos columnas, palabra y frecuencia, separadas por
+        # un tab. Cada linea se parte por su cuenta, asi una linea rota no
+        # corre las columnas de las siguientes. Este conjunto de datos usa
+        # la comilla como caracter, asi que no hay comillas que interpretar.
+        words = {}
+        lines = text.splitlines()
+        # Salta el encabezado
+        for number, line in enumerate(lines[1:], start=2):
+            word, _, freq = line.partition("\t")
+            if not self.only_words(word):
+                continue
+            try:
+                words[word] = int(freq)
+            except ValueError:
+                raise ValueError(
+                    f"{self.model_path}:{number}: frecuencia invalida en {line!r}"
+                ) from None
+        return WordStatistics(words)
 
     def save_model(self, word_statistics: WordStatistics):
         header = [
             "Palabras", "Frecuencias"
         ]
-        with open(self.model_path, mode="w", encoding="utf8") as model_file:
+        # Un buffer de 1 MiB reduce las llamadas al sistema al escribir
+        # cientos de miles de filas.
+        with open(self.model_path, mode="w", encoding="utf8", buffering=1 << 20) as model_file:
             model_writer = csv.writer(model_file, delimiter="\t", quotechar=None)
             model_writer.writerow(header)
-            model_writer.writerows([k, v] for k, v in word_statistics.words.items())
+            model_writer.writerows(word_statistics.words.items())
@@ -1,10 +1,18 @@
 import json
+import logging
 import struct
 import sys
 import threading
 import time
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Any, Callable, TypeVar
 
+try:
+    import orjson
+except ImportError:  # orjson es opcional, ver extras en pyproject.toml
+    orjson = None
+
 from lib.websocket import Websocket, WebsocketFactory
 from maybe import Maybe
 from model import AuthorizedUser, ReadyEvent
@@ -12,6 +20,19 @@ from model import AuthorizedUser, ReadyEvent
 
 T = TypeVar("T")
 
+log = logging.getLogger(__name__)
+
+# Cada evento del Gateway pasa por aqui, asi que se usa orjson cuando esta
+# disponible. Ambas versiones producen JSON en bytes UTF-8, que el websocket
+# envia sin volver a codificar.
+if orjson is not None:
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+else:
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode()
+    _loads = json.loads
+
 class GatewayOpcode:
     """Codigos que declaran el tipo de dato que sera enviado en una
     websocket.
@@ -29,6 +50,10 @@ class GatewayOpcode:
     Hello = 10
     Heartbeat_ACK = 11
 
+# Heartbeat sin numero de secuencia, el primero que se envia.
+heartbeat_null_payload = _dumps({"op": GatewayOpcode.Heartbeat, "d": None})
+
+
 class GatewayEvents:
     """lista no exahustiva de los eventos que puede mandar la Gateway API
     de discord.
@@ -69,28 +94,14 @@ class GatewayIntents:
     AUTO_MODERATION_EXECUTION = 1 << 21
 
 
-class HeartbeatTimer:
-    """Temporizador para el hilo de los Heartbeats
+def report_handler_error(future: Future):
+    """Imprime el error de un manejador de eventos, si lo hubo. El grupo de
+    hilos guarda las excepciones en el Future en vez de mostrarlas.
     """
-    def __init__(self):
-        self.init_time = time.perf_counter()
-        self.last_time = time.perf_counter()
+    error = future.exception()
+    if error is not None:
+        traceback.print_exception(error)
 
-    def start(self):
-        """Empieza el temporizador.
-        """
-        self.init_time = time.perf_counter()
-
-    def stop(self) -> float:
-        """Para el temporizador.
-
-        Returns
-        -------
-        El tiempo en segundos que transcurrio desde la ultima vez que se
-        llamo al metodo `~HeartbeatTimer:start`.
-        """
-        self.last_time = time.perf_counter()
-        return self.last_time -  self.init_time
 
 class DiscordGatewayClient:
     """Cliente del API Gateway de Discord.
@@ -98,7 +109,7 @@ class DiscordGatewayClient:
     Para registra eventos revise el decorador register.
     Revise https://discord.com/developers/docs/topics/gateway-events#receive-events para ver los eventos disponibles.
     """
-    def __init__(self, factory: WebsocketFactory, token: str, intents: int = GatewayIntents.MESSAGE_CONTENT):
+    def __init__(self, factory: WebsocketFactory, token: str, intents: int = GatewayIntents.MESSAGE_CONTENT, handler_workers: int = 8):
         """
         Parameters
         ----------
@@ -112,20 +123,43 @@ class DiscordGatewayClient:
             Los Intents, acciones que el bot declara que necesita hacer. Un
             bit flag, revise la clase GatewayIntents para saber todos los
             intents.
+
+        handler_workers: int
+            Cantidad de hilos que manejan los eventos.
         """
         self.factory = factory
         self.token = token
         self.intents = intents
+        self.handler_workers = handler_workers
         self.session_id = None
         self.resume_gateway_url = None
         self.heartbeat_interval = None
         self.heartbeat_thread = None
-        self.heartbeat_time = HeartbeatTimer()
+        # Momento, en nanosegundos de time.monotonic_ns, en el que se envio
+        # el ultimo Heartbeat.
+        self.heartbeat_sent_ns = time.monotonic_ns()
         self.last_sequence = None
-        self.handlers: dict[str, tuple[Callable[[AuthorizedUser, Any], None], Callable[[Any], Any] | None]] = {}
+        # Cada evento tiene un solo manejador, el cual ya incluye la
+        # transformacion de los datos (si la tiene), de forma que despachar
+        # un evento es una sola busqueda en el diccionario.
+        self.handlers: dict[str, Callable[[AuthorizedUser, Any], None]] = {}
         # Declaramos una funcion vacia para evitar tener que chequear por None
         self.handler_ready_event: Callable[[AuthorizedUser, ReadyEvent], None] = lambda x, y: None
         self.client: AuthorizedUser | None = None
+        # El token y los intents no cambian, asi que el mensaje Identify se
+        # serializa una sola vez.
+        self._identify_payload = _dumps({
+            "op": GatewayOpcode.Identify,
+            "d": {
+                "token": self.token,
+                "intents": self.intents,  # Intents to receive message events
+                "properties": {
+                    "$os": sys.platform,
+                    "$browser": "my_library",
+                    "$device": "my_library"
+                }
+            }
+        })
 
     # Un decorador es azucar sintactica para la operacion:
     # def func():
@@ -160,8 +194,11 @@ class DiscordGatewayClient:
         def inner_function(function: Callable[[AuthorizedUser, T | ReadyEvent], None] ) -> Callable:
             if event == GatewayEvents.READY:
                 self.handler_ready_event = function
+            elif data_transformer is None:
+                self.handlers[event] = function
             else:
-                self.handlers[event] = (function, data_transformer)
+                transformer = data_transformer
+                self.handlers[event] = lambda user, data: function(user, transformer(data))
             return function
         return inner_function
 
@@ -179,18 +216,31 @@ class DiscordGatewayClient:
             Tal vez un evento, en caso de que no haya un error o se corte
             la conexion.
         """
+        # Solo se atrapa el error de decodificar. Un ValueError del
+        # websocket (un frame mal formado) no es un mensaje de cierre.
+        message = ws.receive_messages()
         try:
-            message = ws.receive_messages()
-            return message.map(json.loads)
-        except UnicodeDecodeError:
-            message.map(lambda x: (str(struct.unpack("!H", x[:2])[0]) + " " + x[2:].decode())).peek(print)
-            return Maybe(None)
+            return message.map(_loads)
+        # El mensaje de cierre empieza con un codigo binario. json lanza
+        # UnicodeDecodeError y orjson JSONDecodeError, ambas son ValueError.
+        except ValueError:
+            message.map(
+                lambda x: (str(struct.unpack("!H", x[:2])[0]) + " " + x[2:].decode(errors="replace"))
+            ).peek(lambda reason: log.warning("El Gateway cerro la conexion: %s", reason))
+            return Maybe.nothing()
 
     def run(self):
         """Empieza el bucle principal del programa.
         """
         ws, _ = self.factory.handshake()
-        with ws:
+        # Los eventos se manejan en un grupo fijo de hilos en vez de crear
+        # uno por evento, asi una rafaga de mensajes no dispara la cantidad
+        # de hilos. El grupo es de esta sesion: al salir se esperan los
+        # eventos pendientes, para que no queden manejadores corriendo
+        # despues de que se cierre el bot, y una reconexion que vuelva a
+        # llamar a `run` crea uno nuevo.
+        executor = ThreadPoolExecutor(max_workers=self.handler_workers, thread_name_prefix="gw-handler")
+        with executor, ws:
             # Primero saca el mensaje de inicio
             for data in self.pull_message(ws):
                 self.hello(ws, data)
@@ -215,7 +265,8 @@ class DiscordGatewayClient:
 
                 if opcode == GatewayOpcode.Dispatch:
                     # Maneja el evento en un hilo separado.
-                    threading.Thread(target=self.handle_event, args=(event_type, data)).start()
+                    future = executor.submit(self.handle_event, event_type, data)
+                    future.add_done_callback(report_handler_error)
 
     def hello(self, ws: Websocket, data: Any):
         """Reacciona al evento Hello.
@@ -267,12 +318,15 @@ class DiscordGatewayClient:
         data: Any | None
             Datos que tal vez sean necesario para resumir la conexion.
         """
-        payload = {
-            "op": GatewayOpcode.Heartbeat,
-            "d": data
-        }
-        ws.send_message(json.dumps(payload))
-        self.heartbeat_time.start()
+        # El Heartbeat solo lleva el ultimo numero de secuencia, asi que se
+        # arma directamente en vez de serializar un diccionario cada vez.
+        if data is None:
+            ws.send_message(heartbeat_null_payload)
+        elif type(data) is int:
+            ws.send_message(b'{"op":%d,"d":%d}' % (GatewayOpcode.Heartbeat, data))
+        else:
+            ws.send_message(_dumps({"op": GatewayOpcode.Heartbeat, "d": data}))
+        self.heartbeat_sent_ns = time.monotonic_ns()
 
     def handle_event(self, event_type: str, event_data: Any):
         """Maneja un evento del API Gateway de Discord.
@@ -286,35 +340,29 @@ class DiscordGatewayClient:
             Objeto del evento.
         """
         if event_type == GatewayEvents.READY:
-            event_unserialized = ReadyEvent(**event_data)
+            event_unserialized = ReadyEvent.from_dict(event_data)
             self.session_id = event_unserialized.session_id
-            self.client = AuthorizedUser(self.token, **event_unserialized.user.__dict__)
-            # Necesitamos copiar el objeto para evitar bugs casos en los
-            # que el manejador modifica el objeto, ya que se pasa una
-            # referencia.
-            self.handler_ready_event(self.client, ReadyEvent(**event_unserialized.__dict__))
+            self.client = AuthorizedUser.from_user(self.token, event_unserialized.user)
+            # El cliente solo guarda el session_id y su propio
+            # AuthorizedUser, asi que el manejador puede recibir el evento
+            # sin copiarlo: lo que modifique no afecta al cliente.
+            self.handler_ready_event(self.client, event_unserialized)
             return
 
         if not self.client:
             raise ValueError("Cliente nulo cuando no deberia de ser")
 
-        for (handler, transformer) in Maybe(self.handlers.get(event_type)):
-            data_to_handle = event_data
-            if transformer is not None:
-                data_to_handle = transformer(data_to_handle)
-
-            handler(self.client, data_to_handle)
-
-            break # Este break es necesario para asegurarse de que el
-            # bloque en else solo se ejecute si el for loop no se ejecuto
-        else:
+        handler = self.handlers.get(event_type)
+        if handler is None:
             print("Evento " + event_type + " sin manejador.")
+            return
+        handler(self.client, event_data)
 
     def acknowledge_heartbeat(self):
         """Resetea el temporizador del Heartbeat y revisa la latencia entre
         cuando se envio y cuando recibimos confirmacion.
         """
-        result = self.heartbeat_time.stop()
+        result = (time.monotonic_ns() - self.heartbeat_sent_ns) / 1e9
         if result >= 10:
             print("Hubo un restraso de " + str(result) + " segundos desde que se envio el ultimo Heartbeat")
 
@@ -326,16 +374,4 @@ class DiscordGatewayClient:
         ws: Websocket
             El websocket donde tenemos que autenticarnos.
         """
-        payload = {
-            "op": 2,
-            "d": {
-                "token": self.token,
-                "intents": self.intents,  # Intents to receive message events
-                "properties": {
-                    "$os": sys.platform,
-                    "$browser": "my_library",
-                    "$device": "my_library"
-                }
-            }
-        }
-        ws.send_message(json.dumps(payload))
+        ws.send_message(self._identify_payload)
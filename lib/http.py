@@ -2,7 +2,74 @@ import json
 import re
 import socket
 import ssl
-from typing import Any
+import threading
+from concurrent.futures import Future
+from queue import Queue
+from typing import Any, Hashable
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+# Cuerpo de una Request. Se acepta cualquier objeto que soporte el
+# protocolo de buffer (bytes, bytearray o memoryview), de forma que quien
+# arma el cuerpo no tenga que hacer una copia extra a bytes.
+Body = bytes | bytearray | memoryview
+
+
+# Cuantos bytes se piden por cada recv. Con 64 KiB una respuesta grande
+# necesita muchas menos vueltas (y llamadas al sistema) que con 4 KiB.
+recv_buffer_size = 65536
+
+# Segundos que puede tardar cualquier operacion del socket (conectar,
+# enviar o cada recv) antes de abandonar la Request. Sin esto un servidor
+# lento o que no responde deja al llamador esperando para siempre.
+socket_timeout = 10.0
+
+# Separa los encabezados del cuerpo en una respuesta de HTTP.
+header_terminator = b"\r\n\r\n"
+content_length_pattern = re.compile(rb"Content-Length:\s*(\d+)", re.IGNORECASE)
+# Los nombres de encabezados y el valor "chunked" no distinguen mayusculas.
+chunked_pattern = re.compile(rb"Transfer-Encoding:[^\r\n]*\bchunked\b", re.IGNORECASE)
+
+
+def read_chunks(buffer: bytearray, position: int, body: bytearray) -> tuple[int, bool]:
+    """Decodifica los pedazos completos de un cuerpo con Transfer-Encoding
+    chunked.
+
+    Cada pedazo es su tamaño en hexadecimal, un salto de linea, los datos y
+    otro salto de linea. El ultimo pedazo tiene tamaño 0 y lo siguen
+    encabezados opcionales y una linea vacia.
+
+    Parameters
+    ----------
+    buffer: bytearray
+        Todo lo recibido hasta ahora.
+
+    position: int
+        Donde empieza el siguiente pedazo sin leer.
+
+    body: bytearray
+        Donde se agregan los datos de cada pedazo.
+
+    Returns
+    -------
+    tuple[int, bool]
+        Donde quedo el siguiente pedazo sin leer y si ya se leyo el ultimo.
+    """
+    while True:
+        line_end = buffer.find(b"\r\n", position)
+        if line_end < 0:
+            return position, False
+        # El tamaño puede venir seguido de extensiones, separadas por ;
+        size = int(buffer[position:line_end].split(b";", 1)[0], 16)
+        if size == 0:
+            # Despues del ultimo pedazo puede haber encabezados, el cuerpo
+            # termina con una linea vacia.
+            return position, buffer.find(b"\r\n\r\n", line_end) >= 0
+        data_start = line_end + 2
+        data_end = data_start + size
+        if len(buffer) < data_end + 2:
+            return position, False
+        body += buffer[data_start:data_end]
+        position = data_end + 2
 
 
 class MalformedUrlError(Exception):
@@ -22,15 +89,26 @@ class PrematureSocketClosure(Exception):
     """
     pass
 
+class StaleConnection(PrematureSocketClosure):
+    """La conexion se cerro antes de recibir el primer byte de la
+    respuesta, normalmente porque el servidor cerro una conexion keep-alive
+    inactiva. Es el unico fallo en el que reenviar la Request es seguro.
+    """
+    pass
+
 class HttpMethod:
     GET = "GET"
     POST = "POST"
     DELETE = "DELETE"
     PUT = "PUT"
 
+    # Conjunto precalculado: buscar en __dict__.values() recorria todo el
+    # diccionario de la clase, incluyendo __doc__, __module__ y metodos.
+    methods = frozenset((GET, POST, DELETE, PUT))
+
     @classmethod
     def is_http_method(cls, method: str):
-        return method in cls.__dict__.values()
+        return method in cls.methods
 
 
 class Url:
@@ -40,56 +118,49 @@ class Url:
         self.route = route
         self.port = port
         self.query_params = query_params
+        self._route_for_send: str | None = None
 
     def get_route_for_send(self):
         """Devuelve la ruta con sus parametros añadidos al final.
+
+        Se calcula la primera vez y se reutiliza, las urls no se modifican
+        despues de creadas (el bot reusa la misma Url por canal).
         """
-        return (self.route or "/") + "&".join(map(lambda x:  str(x[0]) + "=" + str(x[1]), self.query_params.items()))
+        if self._route_for_send is None:
+            # urlencode escapa los valores y los separa con &
+            query = urlencode(self.query_params)
+            self._route_for_send = (self.route or "/") + ("?" + query if query else "")
+        return self._route_for_send
 
     @classmethod
     def from_url(cls, url: str):
+        """Analiza una url con la forma esquema://dominio[:puerto][/ruta][?consulta].
 
-        # Grupo 1: Esquema
-        # Grupo 2: Dominio
-        # Grupo 3: Puerto
-        # Grupo 4: Ruta
-        # Grupo 5: Parametros de consulta
-
-        # ^ Empieza desde el inicio de la string
-        # + hace match con uno o mas de la expresion previa
-        # ? Hace match con cero o uno de la expresion previa
-        # \ Sirve para escapara caracteres especiales (como los anteriores)
-        # y usarlos para hacer match.
-        # [] Representa una clase de caracteres, todo lo que esta ahi hace
-        # match de uno, o sea si es uno de los caracteres de ahi.
-        # ([\w+.-]+) Grupo de captura, captura todo lo que sea un caracter,
-        # signo de mas, punto o signo de menos
-        # Una string normal hace match con sigo misma, o sea :// hace match
-        # con eso mismo
-        pattern = r'^([\w+.-]+)://([\w.-]+)(?::(\d+))?(/?[\w\-\./\?=%&]+)?(\?[\w\-\./\?=%&]+)?'
-
-        match = re.match(pattern, url)
-
-        if match:
-            query_params = {}
-            if match.group(5):
-                query_string = match.group(5)
-                for param in query_string.split("&"):
-                    key, value = param.split("=")
-                    query_params[key] = value
-            domain = match.group(2)
-            if not domain:
-                raise MalformedUrlError("El dominio es obligatoro")
-            return cls(
-                match.group(1),
-                domain,
-                match.group(4),
-                int(match.group(3)) if match.group(3) else None,
-                query_params
-            )
-        else:
-            print(url)
-            raise MalformedUrlError()
+        Raises
+        ------
+        MalformedUrlError
+            Si la url no tiene esquema, dominio o su puerto no es valido.
+        """
+        # urlsplit separa la url sin expresiones regulares y ya maneja
+        # puertos, direcciones IPv6 y caracteres escapados.
+        try:
+            parts = urlsplit(url)
+            port = parts.port
+        except ValueError as error:
+            raise MalformedUrlError(url) from error
+
+        if not parts.scheme:
+            raise MalformedUrlError(url)
+        if not parts.hostname:
+            raise MalformedUrlError("El dominio es obligatoro")
+
+        return cls(
+            parts.scheme,
+            parts.hostname,
+            parts.path or None,
+            port,
+            dict(parse_qsl(parts.query))
+        )
 
 class HttpResponse:
     """Respuesta de HTTP.
@@ -103,12 +174,16 @@ class HttpResponse:
         Codigo HTTP del estado de la respuesta.
     body: str
         Cuerpo de la respuesta, si lo tiene.
+    connection_closed: bool
+        El cuerpo se leyo hasta que el servidor cerro la conexion, asi que
+        el socket ya no sirve para otra Request.
     """
 
     def __init__(self, headers: dict[str, list[str]], status_code: int, body: str = ""):
         self.headers = headers
         self.status_code = status_code
         self.body = body
+        self.connection_closed = False
 
     def json(self) -> Any | None:
         """Devuelve el cuerpo de la respuesta como json.
@@ -117,49 +192,56 @@ class HttpResponse:
         return None if self.status_code == 204 else json.loads(self.body)
 
     @classmethod
-    def parse(cls, raw_response: str) -> "HttpResponse":
+    def parse(cls, raw_response: bytes | bytearray) -> "HttpResponse":
         """Lee una Response devuelta por un servidor y la convierte en un
         objeto HttpResponse
 
         Parameters
         ----------
-        raw_response: str
+        raw_response: bytes | bytearray
             La respuesta en su formato sin procesar, directamente salida
             del servidor.
         """
-        headers, body = raw_response.split("\r\n\r\n", 1)
+        # Se trabaja en bytes y se decodifica cada pedazo por separado, en
+        # vez de decodificar toda la respuesta y luego partirla varias veces.
+        header_end = raw_response.find(header_terminator)
+        lines = raw_response[:header_end].split(b"\r\n")
 
-        # Parse headers
-        headers_dict = {}
-        for line in headers.split("\r\n")[1:]:
-            key, value = line.split(":", 1)
-            key = key.strip()
-            value = value.strip()
-            if headers_dict.get(key):
-                 headers_dict[key].append(value)
-            else:
-                headers_dict[key] = [value]
+        # La primera linea es la del estado: HTTP/1.1 200 OK
+        status_code = int(lines[0].split(b" ", 2)[1])
 
-        status_line = headers.split("\r\n", 1)[0]
-        _, status_code_str, _ = status_line.split(" ", 2)
-        status_code = int(status_code_str)
-
-        return cls(headers_dict, status_code, body.strip())
+        # Parse headers
+        headers_dict: dict[str, list[str]] = {}
+        for line in lines[1:]:
+            key, value = line.split(b":", 1)
+            # Los encabezados de HTTP son ISO-8859-1, latin-1 nunca falla.
+            headers_dict.setdefault(key.strip().decode("latin-1"), []).append(
+                value.strip().decode("latin-1")
+            )
 
+        body = raw_response[header_end + len(header_terminator):].strip()
+        return cls(headers_dict, status_code, body.decode())
 
 
 class HttpRequest:
     """
     """
-    def __init__(self, method: str, url: Url, headers: dict[str, list[str]] = {}, data: bytes | None=None):
+    def __init__(self, method: str, url: Url, headers: dict[str, list[str]] | None = None, data: Body | None = None):
 
         if not HttpMethod.is_http_method(method):
             raise InvalidHttpMethod(method)
 
         self.method = method
         self.url = url
-        self.headers = headers
-
+        # Se copia para que el diccionario del llamador, o uno compartido
+        # entre llamadas, nunca se modifique desde aqui.
+        self.headers = dict(headers) if headers else {}
+
+        # Content-Length cuenta bytes, pero el len de un memoryview cuenta
+        # elementos de su formato (o filas, si tiene varias dimensiones). Se
+        # ve como bytes sueltos para que ambos coincidan, sin copiarlo.
+        if isinstance(data, memoryview):
+            data = data.cast("B")
         self.data = data
 
     def serialize(self) -> bytes:
@@ -171,25 +253,29 @@ class HttpRequest:
             Una string de bytes en encoding UTF-8 que puede ser mandada
             como Request.
         """
-        raw_request = f"{self.method} {self.url.get_route_for_send()} HTTP/1.1\r\n"
-
+        # Las lineas se juntan en una lista y se unen una sola vez; sumar
+        # strings con `+=` copia todo lo acumulado en cada encabezado.
         # Asegura que el Host existe, ya que la version 1.1 del protocolo
-        # lo requiere.
-        self.headers["Host"] = [self.url.domain]
+        # lo requiere. Se escribe directo en vez de guardarlo en
+        # `self.headers`, para que serializar no tenga efectos.
+        parts = [
+            f"{self.method} {self.url.get_route_for_send()} HTTP/1.1\r\n",
+            f"Host: {self.url.domain}\r\n",
+        ]
+        append = parts.append
 
         for header, value in self.headers.items():
+            if header == "Host":
+                continue
             for v in value:
-                raw_request += f"{header}: {v}\r\n"
-
-        if self.data:
-            raw_request += f"Content-Length: {len(self.data)}\r\n"
-        else:
-            raw_request += "Content-Length: 0\r\n"
+                append(f"{header}: {v}\r\n")
 
-        raw_request += "\r\n"
+        append(f"Content-Length: {len(self.data) if self.data else 0}\r\n\r\n")
 
-        raw_request = raw_request.encode(encoding="utf-8")
+        raw_request = "".join(parts).encode(encoding="utf-8")
         if self.data:
+            # bytes + (bytes | bytearray | memoryview) hace una sola copia
+            # del cuerpo, sin convertirlo antes a bytes.
             raw_request += self.data
 
         return raw_request
@@ -198,27 +284,43 @@ class HttpClient:
     """Un Cliente de HTTP simple.
     """
     @classmethod
-    def get(cls, url: Url, headers: dict[str, list[str]] = {}):
+    def get(cls, url: Url, headers: dict[str, list[str]] | None = None):
         return cls.request(HttpRequest(HttpMethod.GET, url, headers))
 
     @classmethod
-    def post(cls, url: Url, headers: dict[str, list[str]] = {}, data: bytes | None = None) -> HttpResponse:
+    def post(cls, url: Url, headers: dict[str, list[str]] | None = None, data: Body | None = None) -> HttpResponse:
         return cls.request(HttpRequest(HttpMethod.POST, url, headers, data))
 
     @classmethod
-    def delete(cls, url: Url, headers: dict[str, list[str]] = {}, data: bytes | None = None) -> HttpResponse:
+    def delete(cls, url: Url, headers: dict[str, list[str]] | None = None, data: Body | None = None) -> HttpResponse:
         return cls.request(HttpRequest(HttpMethod.DELETE, url, headers, data))
 
     @classmethod
-    def put(cls, url: Url, headers: dict[str, list[str]] = {}, data: bytes | None = None) -> HttpResponse:
+    def put(cls, url: Url, headers: dict[str, list[str]] | None = None, data: Body | None = None) -> HttpResponse:
         return cls.request(HttpRequest(HttpMethod.PUT, url, headers, data))
 
     @classmethod
     def request(cls, request_object: HttpRequest) -> HttpResponse:
         """Ejecuta una Request en contra la url especificada.
         """
+        with cls.connect(request_object.url) as s:
+            return cls.exchange(s, request_object)
+
+    @classmethod
+    def connect(cls, url: Url) -> socket.socket:
+        """Abre una conexion con el host de la url.
+
+        Parameters
+        ----------
+        url: Url
+            La url a la que nos conectaremos. Si su esquema es https la
+            conexion estara envuelta en TLS.
 
-        url: Url = request_object.url
+        Returns
+        -------
+        socket.socket
+            El socket ya conectado.
+        """
         port = url.port
         if not url.port:
             if url.scheme == "http":
@@ -227,61 +329,268 @@ class HttpClient:
                 port = 443 # Puerto por defecto en https
 
         request_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # El socket de TLS hereda el timeout del socket que envuelve.
+        request_socket.settimeout(socket_timeout)
+        # Las Requests se envian completas con sendall, asi que el algoritmo
+        # de Nagle solo agregaria espera al juntarse con el ACK retrasado.
+        request_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
         if url.scheme == "https":
             request_socket = ssl.create_default_context().wrap_socket(request_socket, server_hostname=url.domain)
 
-        with request_socket as s:
-            request: bytes = request_object.serialize()
-            s.connect((url.domain, port))
-            s.sendall(request)
-            raw_response: bytearray = bytearray()
+        try:
+            request_socket.connect((url.domain, port))
+        except BaseException:
+            request_socket.close()
+            raise
+        return request_socket
 
-            # Esto indica si el header Transfer-Encoding es chunked. Para
-            # asi tratar los datos entrantes de una forma especial.
-            is_transfer_chunked = False
-            # A veces todos los datos se reciben de una, en otras se divide
-            # en pedazos, de forma que necesitamos una forma de señalar
-            # cuando no pedir mas
-            is_body_complete = False
+    @classmethod
+    def exchange(cls, s: socket.socket, request_object: HttpRequest) -> HttpResponse:
+        """Envia una Request por un socket ya conectado y lee su respuesta.
 
-            buffer_size = 4096
+        El socket no se cierra, de forma que puede ser reutilizado para la
+        siguiente Request (keep-alive).
 
-            while True:
-                chunk = s.recv(buffer_size)
+        Parameters
+        ----------
+        s: socket.socket
+            Socket conectado al host de la Request.
 
+        request_object: HttpRequest
+            La Request a enviar.
+
+        Returns
+        -------
+        HttpResponse
+            La respuesta del servidor.
+        """
+        request: bytes = request_object.serialize()
+        try:
+            s.sendall(request)
+            first_chunk = s.recv(recv_buffer_size)
+        except (ConnectionResetError, BrokenPipeError, ssl.SSLEOFError) as error:
+            raise StaleConnection("En request: " + request.decode()) from error
+        if not first_chunk:
+            # El servidor cerro la conexion sin responder nada
+            raise StaleConnection("En request: " + request.decode())
+        raw_response: bytearray = bytearray(first_chunk)
+
+        def receive():
+            chunk = s.recv(recv_buffer_size)
+            if not chunk:
+                # El socket se desconecto
+                raise PrematureSocketClosure("En request: " + request.decode())
+            raw_response.extend(chunk)
+
+        # Primero se leen los encabezados. Solo se busca el separador en lo
+        # recien llegado, mas los ultimos bytes anteriores por si quedo
+        # partido entre dos pedazos.
+        header_end = raw_response.find(header_terminator)
+        while header_end < 0:
+            received = len(raw_response)
+            receive()
+            header_end = raw_response.find(
+                header_terminator, max(0, received - len(header_terminator) + 1)
+            )
+        body_start = header_end + len(header_terminator)
+
+        # HTTP/1.1 204 No Content
+        status_line = raw_response[:raw_response.find(b"\r\n")]
+        if status_line.split(b" ", 2)[1:2] == [b"204"]:
+            # Codigo 204: No Content, no hay cuerpo que esperar.
+            return HttpResponse.parse(raw_response)
+
+        # Con los encabezados completos ya se sabe como termina el cuerpo,
+        # asi que cada lectura siguiente solo tiene que revisar eso. Los
+        # encabezados se buscan dentro de su bloque, no en el cuerpo.
+        if chunked_pattern.search(raw_response, 0, header_end) is not None:
+            # Cuerpo ya decodificado de una respuesta chunked y donde
+            # empieza el siguiente pedazo sin leer.
+            chunked_body = bytearray()
+            chunk_position = body_start
+            while True:
+                chunk_position, is_last = read_chunks(
+                    raw_response, chunk_position, chunked_body
+                )
+                if is_last:
+                    return HttpResponse.parse(raw_response[:body_start] + chunked_body)
+                receive()
+
+        content_length_match = content_length_pattern.search(raw_response, 0, header_end)
+        if content_length_match is None:
+            # Sin Content-Length ni chunked el cuerpo termina cuando el
+            # servidor cierra la conexion.
+            while True:
+                chunk = s.recv(recv_buffer_size)
                 if not chunk:
+                    response = HttpResponse.parse(raw_response)
+                    response.connection_closed = True
+                    return response
+                raw_response.extend(chunk)
+
+        # Con el tamaño conocido se reserva la respuesta completa una sola
+        # vez y el socket escribe directo en ella, sin copiar cada pedazo
+        # recibido ni hacer crecer el buffer.
+        response_length = body_start + int(content_length_match.group(1))
+        received = len(raw_response)
+        if received >= response_length:
+            return HttpResponse.parse(raw_response)
+        response = bytearray(response_length)
+        response[:received] = raw_response
+        with memoryview(response) as view:
+            while received < response_length:
+                read = s.recv_into(view[received:])
+                if not read:
                     # El socket se desconecto
                     raise PrematureSocketClosure("En request: " + request.decode())
+                received += read
+        return HttpResponse.parse(response)
 
-                raw_response.extend(chunk)
 
-                no_content = (str(204) in raw_response.decode().split("\r\n", 1)[0]
-                              and "\r\n\r\n".encode() in raw_response)
-
-                if no_content:
-                    return HttpResponse.parse(raw_response.decode())
-
-                if not is_transfer_chunked:
-                    if b"Content-Length:" in raw_response:
-                        content_length_match = re.search(rb"Content-Length: (\d+)", raw_response)
-                        if content_length_match and b"\r\n\r\n" in raw_response:
-                            content_length = int(content_length_match.group(1))
-                            if len(raw_response.split(b"\r\n\r\n", 1)[1]) >= content_length:
-                                is_body_complete = True
-
-                if not is_body_complete and not is_transfer_chunked:
-                    if b"Transfer-Encoding: chunked" in raw_response:
-                        is_transfer_chunked = True
-
-                if is_transfer_chunked and raw_response.endswith(b"0\r\n\r\n"):
-                    is_body_complete = True
-
-                if is_body_complete:
-                    if is_transfer_chunked:
-                        # [a-fA-F0-9] para hexadecimal, ya que bajo esta
-                        # opcion el tamaño es mandado en ese formato.
-                        # [a-f] hace match a todo caracter entre a y f, osea abcdef
-                        # Los mismo para sus versiones en mayuscula y los numeros
-                        return HttpResponse.parse(re.sub(r"\r\n[a-fA-F0-9]+", "", raw_response.decode()))
-                    return HttpResponse.parse(raw_response.decode())
+class HttpSender:
+    """Cola de envio de Requests en segundo plano.
+
+    Las Requests se encolan con `~HttpSender:submit` y un grupo fijo de
+    hilos las envia, de forma que quien las encola no se queda bloqueado
+    esperando la respuesta del servidor.
+
+    Cada hilo tiene su propia cola. Las Requests encoladas con la misma
+    llave siempre caen en el mismo hilo, asi que se envian en el orden en
+    que se encolaron (por ejemplo, los mensajes de un mismo canal).
+
+    Las conexiones se mantienen abiertas (keep-alive) y se reutilizan para
+    las siguientes Requests al mismo host, evitando repetir el handshake de
+    TCP y TLS en cada envio.
+
+    Los hilos se crean la primera vez que se encola una Request.
+
+    Parameters
+    ----------
+    workers: int
+        Cantidad de hilos de envio.
+    """
+    def __init__(self, workers: int = 1):
+        self._queues: list[Queue[tuple[HttpRequest, Future] | None]] = [
+            Queue() for _ in range(workers)
+        ]
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def submit(self, method: str, url: Url, headers: dict[str, list[str]] | None = None, data: Body | None = None, key: Hashable = None) -> Future:
+        """Encola una Request para ser enviada.
+
+        Parameters
+        ----------
+        method: str
+            Verbo de HTTP, revise la clase HttpMethod.
+
+        url: Url
+            A donde se enviara la Request.
+
+        headers: dict[str, list[str]]
+            Encabezados de la Request.
+
+        data: Body | None
+            Cuerpo de la Request, si lo tiene.
+
+        key: Hashable
+            Las Requests con la misma llave se envian en orden.
+
+        Returns
+        -------
+        Future
+            Futuro que tendra el HttpResponse una vez se complete el envio.
+        """
+        future: Future = Future()
+        queue = self._queues[hash(key) % len(self._queues)]
+        queue.put((HttpRequest(method, url, headers, data), future))
+        self._ensure_started()
+        return future
+
+    def close(self):
+        """Espera a que se envien las Requests pendientes y detiene los
+        hilos de envio.
+        """
+        with self._lock:
+            threads, self._threads = self._threads, []
+        if not threads:
+            return
+        for queue in self._queues:
+            queue.put(None)
+        for thread in threads:
+            thread.join()
+
+    def _ensure_started(self):
+        with self._lock:
+            if not self._threads:
+                for index, queue in enumerate(self._queues):
+                    thread = threading.Thread(
+                        target=self._drain, args=(queue,), name=f"http-sender-{index}", daemon=True
+                    )
+                    thread.start()
+                    self._threads.append(thread)
+
+    def _drain(self, queue: Queue):
+        """Bucle de un hilo de envio. Saca las Requests de su cola y las
+        envia, hasta encontrar None.
+        """
+        connections: dict[tuple[str, str, int | None], socket.socket] = {}
+        while True:
+            item = queue.get()
+            if item is None:
+                break
+            request, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(self._send(request, connections))
+            except Exception as error:
+                future.set_exception(error)
+
+        for connection in connections.values():
+            connection.close()
+
+    def _send(self, request: HttpRequest, connections: dict[tuple[str, str, int | None], socket.socket]) -> HttpResponse:
+        """Envia la Request reutilizando la conexion abierta con su host, si
+        existe.
+        """
+        url = request.url
+        key = (url.scheme, url.domain, url.port)
+        connection = connections.pop(key, None)
+        response = None
+        if connection is not None:
+            try:
+                response = HttpClient.exchange(connection, request)
+            except StaleConnection:
+                # El servidor cerro la conexion mientras estaba inactiva,
+                # se abre una nueva. Cualquier otro fallo (un timeout, un
+                # corte a mitad de la respuesta) no se reintenta: el
+                # servidor pudo haber procesado la Request, y reenviar un
+                # POST o un DELETE lo repetiria.
+                connection.close()
+                connection = None
+            except BaseException:
+                connection.close()
+                raise
+
+        if connection is None:
+            connection = HttpClient.connect(url)
+            try:
+                response = HttpClient.exchange(connection, request)
+            except BaseException:
+                connection.close()
+                raise
+
+        # Un cuerpo leido hasta el cierre deja el socket inservible, aunque
+        # la respuesta no diga "Connection: close".
+        if response.connection_closed or any(
+            value.lower() == "close"
+            for header, values in response.headers.items()
+            if header.lower() == "connection"
+            for value in values
+        ):
+            connection.close()
+        else:
+            connections[key] = connection
+        return response
@@ -1,20 +1,30 @@
 import socket
 import ssl
 import base64
-import random
+import os
 import struct
+import threading
+from functools import cache
 from typing import Callable
 
 from maybe import Maybe
 
-ssl_context = ssl.create_default_context(
-    ssl.Purpose.SERVER_AUTH
-)
 
-ssl_context.verify_mode = ssl.CERT_REQUIRED
-ssl_context.check_hostname = True
-ssl_context.load_default_certs()
+@cache
+def get_ssl_context() -> ssl.SSLContext:
+    """Contexto TLS compartido por las websockets.
 
+    Se crea la primera vez que se pide, asi importar este modulo (por
+    ejemplo, solo para usar Frame) no carga los certificados del disco.
+    """
+    ssl_context = ssl.create_default_context(
+        ssl.Purpose.SERVER_AUTH
+    )
+
+    ssl_context.verify_mode = ssl.CERT_REQUIRED
+    ssl_context.check_hostname = True
+    ssl_context.load_default_certs()
+    return ssl_context
 
 
 class HandshakeFailure(Exception):
@@ -51,6 +61,75 @@ StatusCode = {
 https://datatracker.ietf.org/doc/html/rfc6455#section-7.4.1
 """
 
+# A partir de este tamaño es mas rapido enmascarar por carriles que con
+# el XOR de enteros grandes.
+lane_mask_threshold = 2048
+
+
+@cache
+def xor_table(key: int) -> bytes:
+    """Tabla para `bytes.translate` que combina cada byte con `key` por XOR."""
+    return bytes(b ^ key for b in range(256))
+
+
+def apply_mask(payload: bytes, mask: bytes) -> bytes:
+    """Aplica (o quita, es la misma operacion) la mascara de 4 bytes de
+    RFC6455 al payload.
+
+    Parameters
+    ----------
+    payload: bytes
+        Datos a enmascarar.
+
+    mask: bytes
+        Los 4 bytes de la mascara.
+
+    Returns
+    -------
+    bytes
+        El payload con cada byte `i` combinado con `mask[i % 4]` por XOR.
+    """
+    length = len(payload)
+    if length < lane_mask_threshold:
+        # En vez de hacer el XOR byte por byte en Python, se repite la
+        # mascara hasta cubrir el payload y se hace un solo XOR entre dos
+        # enteros grandes, que corre en C.
+        repeated_mask = (mask * (length // 4 + 1))[:length]
+        return (
+            int.from_bytes(payload, "big") ^ int.from_bytes(repeated_mask, "big")
+        ).to_bytes(length, "big")
+    # Con payloads grandes repetir la mascara mueve tantos bytes como el
+    # payload mismo. Los bytes `i, i + 4, i + 8...` usan todos `mask[i]`,
+    # asi que cada uno de los cuatro carriles se traduce con la tabla de su
+    # byte de mascara, sin construir una mascara del tamaño del payload.
+    masked = bytearray(payload)
+    for i in range(4):
+        masked[i::4] = payload[i::4].translate(xor_table(mask[i]))
+    return bytes(masked)
+
+
+# Cuantas mascaras se sacan de cada lectura de `os.urandom`.
+mask_pool_size = 1024
+_masks = iter(())
+
+
+def next_mask() -> bytes:
+    """Devuelve una mascara de 4 bytes para un frame del cliente.
+
+    RFC6455 pide que las mascaras salgan de una fuente de entropia fuerte,
+    pero llamar a `os.urandom` por cada frame cuesta una llamada al sistema.
+    Se lee un bloque para `mask_pool_size` frames y se reparte de 4 en 4.
+    `next` sobre el iterador de struct no suelta el GIL, asi que dos hilos
+    nunca reciben la misma mascara.
+    """
+    global _masks
+    try:
+        return next(_masks)[0]
+    except StopIteration:
+        _masks = struct.iter_unpack("4s", os.urandom(4 * mask_pool_size))
+        return next(_masks)[0]
+
+
 class Frame:
     def __init__(self, fin: bool, rsv1: bool, rsv2: bool, rsv3: bool, opcode: int, payload: bytes):
         self.fin = fin
@@ -66,7 +145,13 @@ class Frame:
     def serialize(self, masked: bool) -> bytes:
         length = len(self.payload)
 
-        output = bytearray()
+        # Casi todo lo que envia el cliente son frames finales cortos y
+        # enmascarados (heartbeats, identify, pongs). Para ellos la cabecera
+        # y la mascara salen de un solo struct.pack, sin revisar cada bit.
+        if masked and length <= 125 and self.fin and not (self.rsv1 or self.rsv2 or self.rsv3):
+            mask = next_mask()
+            header = struct.pack("!BB4s", 0b10000000 | self.opcode, 0b10000000 | length, mask)
+            return header + apply_mask(self.payload, mask)
 
         head1 = 0b00000000
         if self.fin:
@@ -80,37 +165,23 @@ class Frame:
 
         head1 |= self.opcode
 
-        extended_length: None | bytes = None
-        head2 = 0b00000000
-        # Handle the payload length encoding
+        # Enciende el 8 bit
+        head2 = 0b10000000 if masked else 0b00000000
+        # La cabecera completa, con la longitud extendida si hace falta, se
+        # empaqueta de una vez con struct.
         if length <= 125:
-            head2 |= length
+            header = struct.pack("!BB", head1, head2 | length)
         elif length <= 0xFFFF:
-            head2 |= 126
-            extended_length = struct.pack("!H", length)
+            header = struct.pack("!BBH", head1, head2 | 126, length)
         else:
-            head2 |= 127
-            extended_length = struct.pack("!Q", length)
-
-        if masked:
-            # Enciende el 8 bit
-            head2 |= 0b10000000
-
-        output.append(head1)
-        output.append(head2)
-        if extended_length:
-            output.extend(extended_length)
+            header = struct.pack("!BBQ", head1, head2 | 127, length)
 
+        # join calcula el tamaño total y reserva el frame de una sola vez,
+        # en vez de ir agrandando un bytearray con cada parte.
         if masked:
-            # Genera un numero de 32 bits
-            # De red, un numero de 32 bits sin signo
-            mask = struct.pack('!I', random.getrandbits(32))
-            output.extend(mask)
-            output.extend(bytearray(self.payload[i] ^ mask[i % 4] for i in range(length)))
-        else:
-            output.extend(self.payload)
-
-        return output
+            mask = next_mask()
+            return b"".join((header, mask, apply_mask(self.payload, mask)))
+        return b"".join((header, self.payload))
 
     @classmethod
     def read_from(cls, read: Callable[[int], bytes]) -> Maybe["Frame"]:
@@ -138,12 +209,15 @@ class Frame:
 
         header: bytes = read(2)
         if not header:
-            return Maybe(None)
+            return Maybe.nothing()
+
+        head1 = header[0]
+        head2 = header[1]
 
-        fin: bool = True if header[0] & 0b10000000 else False
-        rsv1: bool = True if header[0] & 0b01000000 else False
-        rsv2: bool = True if header[0] & 0b00100000 else False
-        rsv3: bool = True if header[0] & 0b00010000 else False
+        fin: bool = bool(head1 & 0b10000000)
+        rsv1: bool = bool(head1 & 0b01000000)
+        rsv2: bool = bool(head1 & 0b00100000)
+        rsv3: bool = bool(head1 & 0b00010000)
 
 
         # Del primer byte del header, saca los primeros 4 digitos, los
@@ -152,14 +226,17 @@ class Frame:
         # 10101010 &
         # 00001111 ->
         # 00001010
-        # Sacando asi un numero entre 15 y 0.
-        opcode: int = header[0] & 0x00001111
+        # Sacando asi un numero entre 15 y 0. La mascara es 0b00001111
+        # (0x0F); 0x00001111 seria un numero hexadecimal que solo deja los
+        # bits 0 y 4, y confundia por ejemplo el cierre (0x8) con una
+        # continuacion (0x0).
+        opcode: int = head1 & 0b00001111
         # El opcode es un operational code, dentro de lo establecido
         # (depende del contexto) dice como se interpretan los siguientes
         # datos.
 
         # Obten los primeros 7 bytes
-        payload_length = header[1] & 0b01111111
+        payload_length = head2 & 0b01111111
 
         if payload_length == 126:
             # Los siguientes bytes componen un numero de 16 bits, el modulo
@@ -181,7 +258,7 @@ class Frame:
         # Como esto es unicamente para un cliente, por el RFC6455 Seccion
         # 5.1, el servidor no mandara mascaras, pero por completud tendre
         # esto
-        is_masked = header[1] & 0b10000000
+        is_masked = head2 & 0b10000000
 
         if is_masked:
             # Los siguentes 4 bytes despues de la longitud son de la
@@ -210,7 +287,7 @@ class Frame:
             # 1 ^ 1 -> 0
             # 1 ^ 0 -> 1
             # 0 ^ 0 -> 0
-            payload = bytes([mask[i % 4] ^ payload[i] for i in range(payload_length)])
+            payload = apply_mask(payload, mask)
 
         return Maybe(cls(
             fin,
@@ -228,13 +305,23 @@ class WebsocketOpcode:
     BINARY_FRAME = 0x2
     CONNECTION_CLOSE_FRAME = 0x8
     PING_FRAME = 0x9
-    PONG_FRAME = 0x10
+    PONG_FRAME = 0xA
+
+    # Se calcula una vez al definir la clase, en vez de recorrer
+    # __dict__.values() (que ademas incluye __doc__, __module__, etc.) con
+    # cada frame.
+    opcodes = frozenset((
+        CONTINUATION_FRAME,
+        TEXT_FRAME,
+        BINARY_FRAME,
+        CONNECTION_CLOSE_FRAME,
+        PING_FRAME,
+        PONG_FRAME,
+    ))
 
     @classmethod
     def is_opcode(cls, opcode: int):
-        # __dict__ retorna todos los attributes de un objeto, en nuetro
-        # caso un clase, la cual serian todos sus campos
-        return opcode in cls.__dict__.values()
+        return opcode in cls.opcodes
 
 
 class Websocket:
@@ -242,6 +329,10 @@ class Websocket:
 
     def __init__(self, inner_socket: socket.socket):
         self.inner_socket = inner_socket
+        # Los Heartbeats y los PONG se envian desde hilos distintos. sendall
+        # puede escribir en varias partes, asi que se serializan los envios
+        # para que los frames no se mezclen.
+        self._send_lock = threading.Lock()
 
     def __enter__(self):
         return self
@@ -249,18 +340,22 @@ class Websocket:
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.inner_socket.close()
 
-    def send_message(self, message: str, masked: bool = True):
-
-        frame_bytes = Frame(True, False, False, False, WebsocketOpcode.TEXT_FRAME, message.encode("utf-8")).serialize(masked)
+    def send_message(self, message: str | bytes, masked: bool = True):
+        # Se aceptan bytes ya codificados en UTF-8 para no decodificar y
+        # volver a codificar lo que produce un serializador de JSON.
+        if isinstance(message, str):
+            message = message.encode("utf-8")
+        frame_bytes = Frame(True, False, False, False, WebsocketOpcode.TEXT_FRAME, message).serialize(masked)
 
-        self.inner_socket.send(frame_bytes)
+        with self._send_lock:
+            self.inner_socket.sendall(frame_bytes)
 
     def receive_messages(self) -> Maybe[bytes]:
         result: bytearray = bytearray()
         while True:
             frame: Frame | None = Frame.read_from(self.inner_socket.recv).value
             if not frame:
-                return Maybe(None)
+                return Maybe.nothing()
 
             if frame.opcode in (WebsocketOpcode.TEXT_FRAME,
                                 WebsocketOpcode.BINARY_FRAME,
@@ -271,7 +366,7 @@ class Websocket:
                 self.inner_socket.close()
                 (status_code,) = struct.unpack("!H", frame.payload)
                 print(StatusCode.get(status_code))
-                return Maybe(None)
+                return Maybe.nothing()
 
             if frame.opcode == WebsocketOpcode.PING_FRAME:
                 # Para completud, en la seccion 5.5.2 del RFC6455, se
@@ -295,7 +390,8 @@ class Websocket:
     def send_pong(self, payload: bytes):
         # Create a PONG frame and send it over the socket
         pong_frame = Frame(True, False, False, False, WebsocketOpcode.PONG_FRAME, payload)
-        self.inner_socket.send(pong_frame.serialize(masked=False))
+        with self._send_lock:
+            self.inner_socket.sendall(pong_frame.serialize(masked=False))
 
 class WebsocketFactory:
     """Creador de Websockets.
@@ -356,6 +452,10 @@ class WebsocketFactory:
         # datos, persistente es que la conexion no se cerrara despues de
         # enviar el mensaje.
         s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # Cada frame ya es un mensaje completo. Sin TCP_NODELAY el algoritmo
+        # de Nagle retiene frames pequeños (como los Heartbeats) esperando
+        # el ACK del anterior.
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
         # 80 es el puerto del protocolo http, el cual envia el payload sin
         # ningun tipo de encripcion (o sea, texto simple y claro), el
         # puerto 443 es el de https. La seguridad viene con la capa TLS,
@@ -403,7 +503,7 @@ class WebsocketFactory:
         if self.port == 443:
             # No tengo ni idea de cual seria el mejor, iremos con el que
             # siempre pueden cambiar pero no me hace pensar mucho.
-            s = ssl_context.wrap_socket(s, server_hostname=self.host)
+            s = get_ssl_context().wrap_socket(s, server_hostname=self.host)
 
         retry = True
         retries = 0
@@ -422,7 +522,8 @@ class WebsocketFactory:
         # (¿como?, algun dia tendre un ejemplo) cambian el protocolo a
         # websocket. Es una confirmacion especial y unica del estandar de
         # este protocolo.
-        key = base64.b64encode(bytes(str(random.randint(0, 10**16)), "utf-8"))
+        # El RFC6455 pide 16 bytes aleatorios codificados en base64.
+        key = base64.b64encode(os.urandom(16)).decode()
 
         handshake_request = (
             f"GET {self.route} HTTP/1.1\r\n"
@@ -437,7 +538,12 @@ class WebsocketFactory:
 
         ws = Websocket(s)
 
-        response: bytes | str = b""
+        # Los pedazos se guardan en una lista y se unen al final. Con
+        # `response += ...` cada vuelta copiaba todo lo recibido.
+        chunks: list[bytes] = []
+        # Ultimos bytes del pedazo anterior, por si el b"\r\n\r\n" quedo
+        # partido entre dos pedazos.
+        tail = b""
         # b"\r\n\r\n" es carriage return y line feed, dos veces.
         # \n es line feed (siguiente linea). O sea no volvemos al inicio de
         # la linea. De forma que hacemos un \r carriage return (vuevle al
@@ -449,14 +555,25 @@ class WebsocketFactory:
         # necesario). Pero aqui aparece ya que trabjamos de forma cruda, de
         # bajo nivel y mas importante, para soportar cosas hechas hace 30
         # años.
-        while b"\r\n\r\n" not in response:
+        while True:
             # Recive en pedazos de 4096 bytes. No aseguro que el parseo sea
             # correcto ya que encaja perfectamente con la respuesta de
             # discord antes de los siguientes bytes que son el evento Hello
             # (opcode 10)
-            response += s.recv(4096)
-
-        response = response.decode()
+            chunk = s.recv(4096)
+            if not chunk:
+                s.close()
+                raise HandshakeFailure(
+                    "El host " + self.host + " cerro la conexion durante el handshake"
+                )
+            chunks.append(chunk)
+            # Solo se revisa lo nuevo, mas los 3 bytes anteriores.
+            window = tail + chunk
+            if b"\r\n\r\n" in window:
+                break
+            tail = window[-3:]
+
+        response = b"".join(chunks).decode()
 
         # No estamos haciendo un cliente de http, no veo necesario tener
         # que parsear la respuesta.
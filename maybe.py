@@ -31,11 +31,48 @@ class Maybe(Generic[T]):
                          else Maybe(None))
     )
     >>> assert tal_vez.value == None
+
+    Tambien se puede usar con `match`:
+
+    >>> match Maybe(assoc.get('a')):
+    ...     case Maybe(None):
+    ...         print("No hay nada")
+    ...     case Maybe(valor):
+    ...         print(valor)
+    1
     """
 
+    __slots__ = ("value",)
+    __match_args__ = ("value",)
+
     def __init__(self, value: None | T):
         self.value: None | T = value
 
+    @classmethod
+    def nothing(cls) -> "Maybe":
+        """Devuelve el Maybe vacio compartido.
+
+        Un Maybe no cambia despues de creado, asi que todos los vacios
+        pueden ser el mismo objeto en vez de crear uno nuevo cada vez.
+
+        Returns
+        -------
+        Maybe
+            La instancia unica sin valor.
+        """
+        return _NOTHING
+
+    def __bool__(self) -> bool:
+        """Un Maybe es verdadero solo si contiene un valor, como
+        `Option::is_some` en Rust. Asi `if maybe:` no tiene que crear una
+        lista ni leer `value` a mano.
+        """
+        return self.value is not None
+
+    def __len__(self) -> int:
+        """Cantidad de valores que se obtienen al iterar: 0 o 1."""
+        return 0 if self.value is None else 1
+
     def map(self, func: Callable[[T], U]) -> "Maybe[U]":
         """Aplica una funcion al valor de este objeto, si existe.
 
@@ -56,7 +93,7 @@ class Maybe(Generic[T]):
         """
         if self.value is not None:
             return Maybe(func(self.value))
-        return Maybe(None)
+        return _NOTHING
 
     def flat_map(self, func: Callable[[T], "Maybe[U]"]) -> "Maybe[U]":
         """Aplica una funcion que retorna un Maybe.
@@ -74,7 +111,58 @@ class Maybe(Generic[T]):
         """
         if self.value is not None:
             return func(self.value)
-        return Maybe(None)
+        return _NOTHING
+
+    def map_chain(self, *funcs: Callable) -> "Maybe":
+        """Aplica varias funciones seguidas al valor de este objeto.
+
+        Equivale a `m.map(f).map(g).map(h)`, ya que `map(f).map(g)` es lo
+        mismo que `map(g . f)`, pero solo crea el Maybe final en vez de
+        uno por cada paso.
+
+        Parameters
+        ----------
+        funcs: list[Callable]
+            Funciones a aplicar, en orden.
+
+        Returns
+        -------
+        Maybe
+            El resultado de la ultima funcion, o el Maybe vacio si el valor
+            no existe o alguna funcion devuelve None.
+        """
+        value = self.value
+        for func in funcs:
+            if value is None:
+                return _NOTHING
+            value = func(value)
+        if value is None:
+            return _NOTHING
+        return Maybe(value)
+
+    def and_then_chain(self, *funcs: Callable[..., "Maybe"]) -> "Maybe":
+        """Aplica varias funciones que retornan un Maybe, como
+        `m.flat_map(f).flat_map(g)`.
+
+        Se detiene en el primer Maybe vacio, sin llamar a las funciones
+        que faltan.
+
+        Parameters
+        ----------
+        funcs: list[Callable[..., Maybe]]
+            Funciones a aplicar, en orden.
+
+        Returns
+        -------
+        Maybe
+            El Maybe devuelto por la ultima funcion, o el primero vacio.
+        """
+        result = self
+        for func in funcs:
+            if result.value is None:
+                return _NOTHING
+            result = func(result.value)
+        return result
 
     def peek(self, func: Callable[[T], None]) -> Self:
         """Applica una funcion sobre el valor interno, no espera que retorne un valor.
@@ -102,8 +190,12 @@ class Maybe(Generic[T]):
     # Abusemos del lenguaje
     def __iter__(self) -> Iterator[T]:
         """Permite iterar sobre el valor interno si existe."""
-        if self.value is not None:
-            yield self.value
+        # El iterador de una tupla esta en C; un generador crearia un frame
+        # de Python cada vez que se itera.
+        value = self.value
+        if value is not None:
+            return iter((value,))
+        return iter(())
 
     @classmethod
     def do(cls, iterable: Iterable):
@@ -122,33 +214,66 @@ class Maybe(Generic[T]):
             Tal vez un valor
         """
 
-        for value in iterable:
-            return cls(value)
-        return cls(None)
+        value = next(iter(iterable), None)
+        if value is None:
+            return _NOTHING
+        return cls(value)
 
-    def __rshift__(self, func):
-        return self.flat_map(func)
+    @classmethod
+    def filter_map(cls, iterable: Iterable[T], func: Callable[[T], U | None]) -> Iterator[U]:
+        """Aplica `func` a cada elemento y deja solo los resultados que no
+        son None.
+
+        Se prefiere sobre `[Maybe.do([func(x)]) for x in xs]` y luego
+        descartar los vacios, ya que no envuelve cada resultado en un Maybe
+        y lo recorre una sola vez.
+
+        Parameters
+        ----------
+        iterable: Iterable[T]
+            Elementos a recorrer.
+
+        func: Callable[[T], U | None]
+            Funcion que devuelve None cuando el elemento se descarta.
+
+        Returns
+        -------
+        Iterator[U]
+            Los resultados presentes, en orden.
+        """
+        return (result for result in map(func, iterable) if result is not None)
 
-    # Esta funcion no deberia de estar aqui, pero como es de cosas de
-    # programacion funcional, se queda.
     @classmethod
-    def progn(cls, *args: Callable):
-        """Ejecuta mutiples funciones de forma serial.
+    def flat_map_iter(cls, iterable: Iterable[T], func: Callable[[T], "Maybe[U]"]) -> Iterator[U]:
+        """Como `filter_map`, pero para funciones que retornan un Maybe.
 
         Parameters
         ----------
-        args: list[Callable]
-            Lista de funciones
+        iterable: Iterable[T]
+            Elementos a recorrer.
+
+        func: Callable[[T], Maybe[U]]
+            Funcion que devuelve un Maybe por elemento.
 
         Returns
         -------
-        Any:
-            El resultado de la ultima funcion.
+        Iterator[U]
+            Los valores de los Maybe que no estan vacios, en orden.
         """
-        result = None
-        for arg in args:
-            result = arg()
-        return result
+        return (
+            maybe.value for maybe in map(func, iterable) if maybe.value is not None
+        )
+
+    def __rshift__(self, func):
+        return self.flat_map(func)
+
+    @classmethod
+    def progn(cls, *args: Callable):
+        """Obsoleto, use la funcion `progn` del modulo.
+
+        Se mantiene para no romper a quien ya la usa.
+        """
+        return progn(args)
 
     def get(self, key):
         if self.value is not None:
@@ -157,4 +282,32 @@ class Maybe(Generic[T]):
             else:
                 raise AttributeError(self.value, "No tiene metodo 'get'")
 
-        return Maybe(None)
+        return _NOTHING
+
+
+# El Maybe vacio. Se crea sin pasar por `__init__`, ya que no hace falta.
+_NOTHING: Maybe = object.__new__(Maybe)
+_NOTHING.value = None
+
+
+def progn(funcs: Iterable[Callable]):
+    """Ejecuta mutiples funciones de forma serial.
+
+    Antes era un metodo de clase de Maybe, aunque no tiene que ver con el.
+    Recibe un iterable en vez de `*args` para no armar una tupla en cada
+    llamada cuando las funciones ya estan en una lista.
+
+    Parameters
+    ----------
+    funcs: Iterable[Callable]
+        Funciones a ejecutar, en orden.
+
+    Returns
+    -------
+    Any:
+        El resultado de la ultima funcion.
+    """
+    result = None
+    for func in funcs:
+        result = func()
+    return result
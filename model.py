@@ -4,18 +4,69 @@ de json automatico.
 
 # Herramienta en cuestion: https://jsonformatter.org/json-to-python
 
-from typing import List, Any
+# Las clases son dataclasses con slots: el __init__ generado asigna
+# directo a los slots, sin el trabajo de un __init__ escrito a mano. Los
+# campos son solo de llave (kw_only) porque siempre se construyen desde
+# el json del evento, y asi las subclases pueden agregar campos
+# obligatorios despues de los opcionales de su clase base.
+
+# Las anotaciones quedan como strings y no se evaluan al importar. Ningun
+# codigo las lee en tiempo de ejecucion; dataclass solo revisa su texto.
+from __future__ import annotations
+
+import sys
+from dataclasses import dataclass, field
+from typing import List, Any, Self, TypedDict
 from datetime import datetime
 
-class MessageReference:
-    def __init__(self, **kwargs):
-        self.message_id = kwargs.get('message_id')
-        self.channel_id = kwargs.get('channel_id')
-        self.guild_id = kwargs.get('guild_id')
-        self.fail_if_not_exists = kwargs.get('fail_if_not_exists')
+def parse_timestamp(value: str | datetime | None) -> datetime | None:
+    """Convierte una fecha ISO 8601 de Discord a datetime.
+
+    Desde Python 3.11 `datetime.fromisoformat` acepta el formato completo
+    que usa Discord (con microsegundos y zona horaria) y esta escrito en C,
+    asi que no hace falta una dependencia como dateutil o ciso8601.
+    """
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+
+class FromDict:
+    """Construye un modelo desde el json de un evento.
+
+    Discord agrega campos a sus objetos sin aviso, y pasarlos tal cual al
+    `__init__` generado lo romperia. Lo normal es que el json solo tenga
+    campos conocidos, asi que se pasa el diccionario directo y solo se
+    filtran las llaves cuando sobra alguna. No se atrapa el TypeError del
+    `__init__`: tambien saldria de `__post_init__` (un modelo anidado
+    invalido, un id nulo) y reintentar lo ocultaria.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> Self:
+        fields = cls.__dataclass_fields__
+        # Comparar las vistas de llaves no arma un conjunto nuevo, a
+        # diferencia de restarlas.
+        if data.keys() <= fields.keys():
+            return cls(**data)
+        return cls(**{key: value for key, value in data.items() if key in fields})
 
 
-class Author:
+class MessageReference(TypedDict, total=False):
+    """Referencia a otro mensaje, en respuestas e hilos.
+
+    No tiene metodos, asi que se queda como el diccionario que ya salio del
+    json en vez de copiarlo a un objeto. Las llaves se leen con `get`.
+    """
+    message_id: str
+    channel_id: str
+    guild_id: str
+    fail_if_not_exists: bool
+
+
+@dataclass(slots=True, kw_only=True, eq=False)
+class Author(FromDict):
     username: str
     public_flags: int
     id: str
@@ -23,22 +74,19 @@ class Author:
     discriminator: int
     avatar_decoration_data: None
     avatar: str
-    bot: bool | None
-    clan: Any | None
-
-    def __init__(self, username: str, public_flags: int, id: str, global_name: str, discriminator: int, avatar_decoration_data: None, avatar: str, bot: bool | None = None, clan: Any | None = None) -> None:
-        self.username = username
-        self.public_flags = public_flags
-        self.id = id
-        self.global_name = global_name
-        self.discriminator = discriminator
-        self.avatar_decoration_data = avatar_decoration_data
-        self.avatar = avatar
-        self.bot = bot
-        self.clan = clan
-
-
-class Member:
+    bot: bool | None = None
+    clan: Any | None = None
+
+    def __post_init__(self):
+        # Los ids de autores, canales y servidores se repiten en miles de
+        # eventos. Internados, todos los eventos comparten la misma string
+        # y compararlos como llave (caches, colas por canal) empieza por la
+        # identidad.
+        self.id = sys.intern(self.id)
+
+
+@dataclass(slots=True, kw_only=True, eq=False)
+class Member(FromDict):
     roles: List[Any]
     premium_since: None
     pending: bool
@@ -50,106 +98,101 @@ class Member:
     communication_disabled_until: None
     avatar: None
 
-    def __init__(self, roles: List[Any], premium_since: None, pending: bool, nick: None, mute: bool, joined_at: datetime, flags: int, deaf: bool, communication_disabled_until: None, avatar: None) -> None:
-        self.roles = roles
-        self.premium_since = premium_since
-        self.pending = pending
-        self.nick = nick
-        self.mute = mute
-        self.joined_at = joined_at
-        self.flags = flags
-        self.deaf = deaf
-        self.communication_disabled_until = communication_disabled_until
-        self.avatar = avatar
+    def __post_init__(self):
+        self.joined_at = parse_timestamp(self.joined_at)
 
-class Message:
+@dataclass(slots=True, kw_only=True, eq=False)
+class Message(FromDict):
 
     # Documentacion oficial: https://discord.com/developers/docs/resources/channel#message-object
     type: int
     tts: bool
     timestamp: datetime
-    referenced_message: None
+    referenced_message: None = None
     pinned: bool
-    nonce: str | None
+    nonce: str | None = None
     mention_roles: List[Any]
     mention_everyone: bool
     id: str
     flags: int
     embeds: List[Any]
-    edited_timestamp: None
+    edited_timestamp: datetime | None
     content: str
     components: List[Any]
     channel_id: str
     author: Any | Author
     attachments: List[Any]
-
-    def __init__(self, type: int, tts: bool, timestamp: datetime, pinned: bool, mention_roles: List[Any], mention_everyone: bool, id: str, flags: int, embeds: List[Any], edited_timestamp: None, content: str, components: List[Any], channel_id: str, author: Any | Author, attachments: List[Any], nonce: str | None = None, message_reference: MessageReference | None = None, webhook_id: str | None = None, resolved = None, role_subscription_data = None, position = None, interaction_metadata = None, application_id = None, referenced_message: None = None) -> None:
-        self.type = type
-        self.tts = tts
-        self.timestamp = timestamp
-        self.referenced_message = referenced_message
-        self.pinned = pinned
-        self.nonce = nonce
-        self.mention_roles = mention_roles
-        self.mention_everyone = mention_everyone
-        self.id = id
-        self.flags = flags
-        self.embeds = embeds
-        self.edited_timestamp = edited_timestamp
-        self.content = content
-        self.components = components
-        self.channel_id = channel_id
-        self.author = author if isinstance(author, Author) else Author(**author)
-        self.attachments = attachments
-        self.message_reference = message_reference if isinstance(message_reference, MessageReference) else MessageReference(**message_reference) if message_reference else None
-        self.webhook_id = webhook_id
-        self.position = position
-        self.role_subscription_data = role_subscription_data
-        self.resolved = resolved
-        self.interaction_metadata = interaction_metadata
-        self.application_id = application_id
-
-
+    message_reference: MessageReference | None = None
+    webhook_id: str | None = None
+    position: Any = None
+    role_subscription_data: Any = None
+    resolved: Any = None
+    interaction_metadata: Any = None
+    application_id: Any = None
+
+    def __post_init__(self):
+        self.channel_id = sys.intern(self.channel_id)
+        if self.webhook_id is not None:
+            self.webhook_id = sys.intern(self.webhook_id)
+        self.timestamp = parse_timestamp(self.timestamp)
+        self.edited_timestamp = parse_timestamp(self.edited_timestamp)
+        if not isinstance(self.author, Author):
+            self.author = Author.from_dict(self.author)
+        if not self.message_reference:
+            self.message_reference = None
+
+
+@dataclass(slots=True, kw_only=True, eq=False)
 class CreateMessage(Message):
     """Objeto raiz del evento MESSAGE_CREATE del GatewayAPI.
     """
     guild_id: str
     member: Any | Member
     mentions: List[Any]
-
-    def __init__(self, guild_id: str, member: Any | Member, mentions: List[Any], **kwargs):
-        super().__init__(**kwargs)
-        self.mentions = mentions
-        self.member = member if isinstance(member, Member) else Member(**member)
-        self.guild_id = guild_id
-
-
-class Application:
+    # Json del miembro hasta que alguien lo pida, vease `__getattr__`.
+    _member_raw: Any = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        # super() sin argumentos no funciona en dataclasses con slots, ya
+        # que la clase se vuelve a crear.
+        Message.__post_init__(self)
+        if self.guild_id is not None:
+            self.guild_id = sys.intern(self.guild_id)
+        if not isinstance(self.member, Member):
+            # El Member se construye la primera vez que se lee. Al borrar
+            # el slot, leer `member` cae en `__getattr__`.
+            self._member_raw = self.member
+            del self.member
+
+    def __getattr__(self, name: str) -> Any:
+        # Solo se llama cuando el atributo no existe, o sea cuando el slot
+        # de `member` fue vaciado en `__post_init__`.
+        if name == "member":
+            member = self.member = Member.from_dict(self._member_raw)
+            self._member_raw = None
+            return member
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+
+@dataclass(slots=True, kw_only=True, eq=False)
+class Application(FromDict):
     id: str
     flags: int
 
-    def __init__(self, id: str, flags: int) -> None:
-        self.id = id
-        self.flags = flags
-
 
+@dataclass(slots=True, eq=False)
 class Auth:
     pass
 
-    def __init__(self, ) -> None:
-        pass
 
-
-class Guild:
+@dataclass(slots=True, kw_only=True, eq=False)
+class Guild(FromDict):
     unavailable: bool
     id: str
 
-    def __init__(self, unavailable: bool, id: str) -> None:
-        self.unavailable = unavailable
-        self.id = id
-
 
-class User:
+@dataclass(slots=True, kw_only=True, eq=False)
+class User(FromDict):
     verified: bool
     username: str
     mfa_enabled: bool
@@ -160,21 +203,9 @@ class User:
     discriminator: int
     bot: bool
     avatar: None
-    clan: Any | None
-
-    def __init__(self, verified: bool, username: str, mfa_enabled: bool, id: str, global_name: None, flags: int, email: None, discriminator: int, bot: bool, avatar: None, clan: Any | None = None) -> None:
-        self.verified = verified
-        self.username = username
-        self.mfa_enabled = mfa_enabled
-        self.id = id
-        self.global_name = global_name
-        self.flags = flags
-        self.email = email
-        self.discriminator = discriminator
-        self.bot = bot
-        self.avatar = avatar
-        self.clan = clan
+    clan: Any | None = None
 
+@dataclass(slots=True, kw_only=True, eq=False)
 class AuthorizedUser(User):
     """Clase customizada para guardar el token de acceso.
 
@@ -187,12 +218,28 @@ class AuthorizedUser(User):
     kwargs: dict[Any, Any]
         Argumentos del constructor de la clase User
     """
+    token: str
 
-    def __init__(self, token: str, **kwargs):
-        super().__init__(**kwargs)
-        self.token = token
-
-class ReadyEvent:
+    @classmethod
+    def from_user(cls, token: str, user: User) -> AuthorizedUser:
+        """Crea el usuario autorizado a partir del User del evento READY."""
+        return cls(
+            token=token,
+            verified=user.verified,
+            username=user.username,
+            mfa_enabled=user.mfa_enabled,
+            id=user.id,
+            global_name=user.global_name,
+            flags=user.flags,
+            email=user.email,
+            discriminator=user.discriminator,
+            bot=user.bot,
+            avatar=user.avatar,
+            clan=user.clan,
+        )
+
+@dataclass(slots=True, kw_only=True, eq=False)
+class ReadyEvent(FromDict):
     """Raiz del evento READY en la API Gateway de Discord.
     """
     v: int
@@ -211,20 +258,6 @@ class ReadyEvent:
     application: Application
     _trace: List[str]
 
-    def __init__(self, v: int, user_settings: Auth, user: User | Any, session_type: str, session_id: str, resume_gateway_url: str, relationships: List[Any], private_channels: List[Any], presences: List[Any], guilds: List[Guild], guild_join_requests: List[Any], geo_ordered_rtc_regions: List[str], auth: Auth, application: Application, _trace: List[str]) -> None:
-        self.v = v
-        self.user_settings = user_settings
-        self.user = user if isinstance(user, User) else User(**user)
-        self.session_type = session_type
-        self.session_id = session_id
-        self.resume_gateway_url = resume_gateway_url
-        self.relationships = relationships
-        self.private_channels = private_channels
-        self.presences = presences
-        self.guilds = guilds
-        self.guild_join_requests = guild_join_requests
-        self.geo_ordered_rtc_regions = geo_ordered_rtc_regions
-        self.auth = auth
-        self.application = application
-        self._trace = _trace
-
+    def __post_init__(self):
+        if not isinstance(self.user, User):
+            self.user = User.from_dict(self.user)
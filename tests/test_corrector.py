@@ -0,0 +1,104 @@
+"""Pruebas del corrector de palabras."""
+
+import random
+import unittest
+from pathlib import Path
+
+from corrector import CsvModelLoader, NorvigCorrector, WordStatistics
+
+model_path = Path(__file__).parent.parent / "models" / "crea_formas_ortograficas.txt"
+
+
+class NoSave:
+    """Cargador que no escribe el modelo, para no tocar el archivo real."""
+
+    def save_model(self, word_statistics: WordStatistics):
+        pass
+
+
+def edits1(word: str, letters: str) -> set[str]:
+    """Ediciones a distancia 1 de `word`, como en el algoritmo de Norvig.
+
+    Es la implementacion de referencia con la que se compara el recorrido
+    del arbol de prefijos.
+    """
+    splits = [(word[:i], word[i:]) for i in range(len(word) + 1)]
+    deletes = [L + R[1:] for L, R in splits if R]
+    transposes = [L + R[1] + R[0] + R[2:] for L, R in splits if len(R) > 1]
+    replaces = [L + c + R[1:] for L, R in splits if R for c in letters]
+    inserts = [L + c + R for L, R in splits for c in letters]
+    return set(deletes + transposes + replaces + inserts)
+
+
+def edits2(word: str, letters: str):
+    """Ediciones a distancia 2 de `word`."""
+    return (e2 for e1 in edits1(word, letters) for e2 in edits1(e1, letters))
+
+
+def norvig_candidates(words: dict[str, int], word: str) -> set[str]:
+    """Candidatos de `word` calculados como en el algoritmo original."""
+    letters = "".join(set("".join(words)))
+    known = words.keys()
+    return set(
+        known & {word}
+        or known & edits1(word, letters)
+        or known & set(edits2(word, letters))
+        or {word}
+    )
+
+
+def make_typo(rng: random.Random, word: str, letters: str) -> str:
+    """Aplica una o dos ediciones al azar a `word`."""
+    for _ in range(rng.choice((1, 2, 2))):
+        i = rng.randrange(len(word) + 1)
+        edit = rng.choice("dtri")
+        if edit == "d" and i < len(word):
+            word = word[:i] + word[i + 1:]
+        elif edit == "t" and i < len(word) - 1:
+            word = word[:i] + word[i + 1] + word[i] + word[i + 2:]
+        elif edit == "r" and i < len(word):
+            word = word[:i] + rng.choice(letters) + word[i + 1:]
+        else:
+            word = word[:i] + rng.choice(letters) + word[i:]
+    return word
+
+
+class TestNorvigCorrector(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.model = CsvModelLoader(model_path).get_model()
+
+    def corrector(self, words: dict[str, int]) -> NorvigCorrector:
+        return NorvigCorrector(WordStatistics(words), NoSave())
+
+    def test_candidates_match_norvig(self):
+        # `edits2` tarda cerca de un segundo por palabra con el modelo
+        # completo, asi que se compara contra las palabras frecuentes. La
+        # equivalencia no depende del tamaño del diccionario.
+        words = {word: freq for word, freq in self.model.words.items() if freq >= 200}
+        corrector = self.corrector(dict(words))
+        letters = "".join(sorted(set("".join(words))))
+        rng = random.Random(0)
+        pool = sorted(word for word in words if 4 <= len(word) <= 10)
+        typos = [make_typo(rng, rng.choice(pool), letters) for _ in range(60)]
+        for typo in typos + ["izdjeron", "pregtuo"]:
+            with self.subTest(typo=typo):
+                self.assertEqual(
+                    set(corrector.candidates(typo)), norvig_candidates(words, typo)
+                )
+
+    def test_transpose_across_edit(self):
+        # Ambas necesitan transponer dos letras y ademas insertar o borrar
+        # una entre ellas. El arbol no las encontraba.
+        corrector = self.corrector(dict(self.model.words))
+        self.assertEqual(corrector.spell_check("izdjeron"), ["dijeron"])
+        self.assertEqual(corrector.spell_check("pregtuo"), ["pregunto"])
+
+    def test_known_word(self):
+        corrector = self.corrector(dict(self.model.words))
+        self.assertEqual(corrector.spell_check("perro"), ["perro"])
+
+
+if __name__ == "__main__":
+    unittest.main()